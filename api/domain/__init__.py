@@ -226,6 +226,15 @@ production_api_operations = {
                     "PUT"
                 ]
             },
+            "/production-api/v1/update-products": {
+                'function': "apply a batch of product updates (update_status, set_product_error, "
+                            "set_product_unavailable, mark_product_complete) in one transaction",
+                'comments': 'JSON body is a list of objects, each with action, name, orderid and the '
+                            'parameters for that action. Returns a result per object',
+                'methods': [
+                    "POST"
+                ]
+            },
             "/production-api/v1/configuration/<key>": {
                 'function': "list value for specified configuration key",
                 'methods': [
@@ -0,0 +1,113 @@
+"""
+Lookup catalog of Collection IDs (LC08_...) to M2M entity IDs
+
+The entity ID assigned to a display ID never changes, so once M2M has
+resolved one it is kept in ordering_entity_catalog, with a bounded
+in-process LRU in front of the table
+"""
+import threading
+from collections import OrderedDict
+
+import psycopg2
+import psycopg2.extras as db_extras
+
+from api.system.logger import ilogger as logger
+from api.util import api_cfg
+from api.util.dbconnect import DBConnect, DBConnectException
+
+# Mappings held in memory by each process
+CACHE_SIZE = 100000
+
+
+class EntityCatalog(object):
+    """
+    Known product ID -> entity ID mappings, per M2M dataset
+
+    The catalog is only ever a shortcut in front of M2M, so database
+    problems are logged and treated as misses rather than raised
+    """
+    def __init__(self, maxsize=None):
+        self.maxsize = maxsize or CACHE_SIZE
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, dataset, product_ids):
+        """
+        Find the entity IDs already known for the product IDs
+
+        :param dataset: M2M dataset name
+        :type dataset: str
+        :param product_ids: Collection IDs ['LC08_..', ...]
+        :type product_ids: list
+        :return: dict of the IDs found, {product_id: entity_id}
+        """
+        found = dict()
+        with self._lock:
+            for pid in product_ids:
+                key = (dataset, pid)
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    found[pid] = self._cache[key]
+
+        missing = tuple({p for p in product_ids if p not in found})
+        if missing:
+            from_db = self._select(dataset, missing)
+            self._remember(dataset, from_db)
+            found.update(from_db)
+        return found
+
+    def store(self, dataset, entity_ids):
+        """
+        Record newly resolved mappings, IDs M2M could not resolve (None)
+        are not kept so they will be asked about again
+
+        :param dataset: M2M dataset name
+        :type dataset: str
+        :param entity_ids: {product_id: entity_id}
+        :type entity_ids: dict
+        """
+        resolved = {p: str(e) for p, e in entity_ids.items() if e}
+        if not resolved:
+            return
+        self._remember(dataset, resolved)
+        self._insert(dataset, resolved)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _remember(self, dataset, entity_ids):
+        with self._lock:
+            for pid, eid in entity_ids.items():
+                key = (dataset, pid)
+                self._cache[key] = eid
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+    # The catalog uses its own connection, rather than db_instance(), so a
+    # failure here can never abort a caller's unit_of_work
+    @staticmethod
+    def _select(dataset, product_ids):
+        sql = ('SELECT display_id, entity_id FROM ordering_entity_catalog '
+               'WHERE dataset = %s AND display_id IN %s')
+        try:
+            with DBConnect(**api_cfg('db')) as db:
+                db.select(sql, (dataset, product_ids))
+                return {r['display_id']: r['entity_id'] for r in db}
+        except DBConnectException as e:
+            logger.error('Entity catalog lookup failed: {}'.format(e))
+            return dict()
+
+    @staticmethod
+    def _insert(dataset, entity_ids):
+        sql = ('INSERT INTO ordering_entity_catalog '
+               '(dataset, display_id, entity_id) VALUES %s '
+               'ON CONFLICT (dataset, display_id) DO NOTHING')
+        values = [(dataset, p, e) for p, e in sorted(entity_ids.items())]
+        try:
+            with DBConnect(**api_cfg('db')) as db:
+                db_extras.execute_values(db.cursor, sql, values)
+                db.commit()
+        except (DBConnectException, psycopg2.Error) as e:
+            logger.error('Entity catalog update failed: {}'.format(e))
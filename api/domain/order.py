@@ -24,6 +24,13 @@ class Order(object):
     valid_statuses = ('complete', 'oncache', 'onorder', 'purged',
                       'processing', 'error', 'unavailable', 'submitted')
 
+    # columns written by save()
+    save_cols = ('orderid', 'status', 'order_source',
+                 'product_options', 'product_opts', 'order_type',
+                 'initial_email_sent', 'completion_email_sent',
+                 'note', 'completion_date', 'order_date', 'user_id',
+                 'ee_order_id', 'email', 'priority')
+
     def __init__(self, id=None, orderid=None, status=None, order_source=None,
                  order_type=None, product_options=None,
                  product_opts=None, initial_email_sent=None,
@@ -67,6 +74,7 @@ class Order(object):
         self.ee_order_id = ee_order_id
         self.email = email
         self.priority = priority
+        self._mark_clean()
 
         if id:
             # no need to query the DB again
@@ -498,41 +506,39 @@ class Order(object):
 
     def save(self):
         """
-        Upsert self to the database
+        Upsert self to the database, only changed columns are
+        updated on an existing order
         """
-        sql = ('INSERT INTO ordering_order %s VALUES %s '
+        dirty = self.dirty_fields() if self.id else self.save_cols
+        if not dirty:
+            return
+
+        sql = ('INSERT INTO ordering_order ({0}) VALUES %s '
                'ON CONFLICT (orderid) '
                'DO UPDATE '
-               'SET %s = %s')
-
-        attr_tup = ('orderid', 'status', 'order_source',
-                    'product_options', 'product_opts', 'order_type',
-                    'initial_email_sent', 'completion_email_sent',
-                    'note', 'completion_date', 'order_date', 'user_id',
-                    'ee_order_id', 'email', 'priority')
+               'SET {1} '
+               'RETURNING id, {0}'
+               .format(','.join(self.save_cols),
+                       ', '.join('{0} = EXCLUDED.{0}'.format(c)
+                                 for c in dirty)))
 
         vals = tuple(self.__getattribute__(v)
                      if v != 'product_opts'
                      else json.dumps(self.__getattribute__(v))
-                     for v in attr_tup)
-
-        cols = '({})'.format(','.join(attr_tup))
+                     for v in self.save_cols)
 
         log_sql = ''
         try:
             with db_instance() as db:
-                log_sql = db.cursor.mogrify(sql, (db_extns.AsIs(cols),
-                                                  vals,
-                                                  db_extns.AsIs(cols),
-                                                  vals))
-                db.execute(sql, (db_extns.AsIs(cols), vals,
-                                 db_extns.AsIs(cols), vals))
+                log_sql = db.cursor.mogrify(sql, (vals,))
+                db.execute(sql, (vals,))
                 db.commit()
+                new = dict(db[0])
 
                 msg = f"\n*** Saved updates to order id: {self.orderid}\n" \
                       f"order.id: {self.id}\n" \
                       f"sql: {log_sql}\n" \
-                      f"args: {list(zip(attr_tup, vals))}\n***"
+                      f"args: {list(zip(self.save_cols, vals))}\n***"
                 logger.info(msg)
 
         except DBConnectException as e:
@@ -542,10 +548,24 @@ class Order(object):
 
             raise OrderException(e)
 
-        new = Order.find(self.id)
+        for att, val in new.items():
+            self.__setattr__(att, val)
+        self._mark_clean()
+
+    def dirty_fields(self):
+        """
+        Columns which have been modified since the order was loaded
+        or last saved
+
+        :return: tuple of column names
+        """
+        return tuple(c for c in self.save_cols
+                     if self.__getattribute__(c) != self._persisted.get(c))
 
-        for att in attr_tup:
-            self.__setattr__(att, new.__getattribute__(att))
+    def _mark_clean(self):
+        # product_opts is a dict, so keep a copy rather than a reference
+        self._persisted = {c: copy.deepcopy(self.__getattribute__(c))
+                           for c in self.save_cols}
 
     def update(self, att, val):
         """
@@ -571,6 +591,8 @@ class Order(object):
                             .format(message, log_sql))
 
         self.__setattr__(att, val)
+        if att in self._persisted:
+            self._persisted[att] = copy.deepcopy(val)
 
         return self.__getattribute__(att)
 
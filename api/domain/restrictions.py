@@ -0,0 +1,122 @@
+"""
+Purpose: shared, indexed view of domain/restricted.yaml
+
+The file is parsed once per process, and only parsed again when its
+modification time changes.  Everything handed out is read-only, since
+the same index is shared by every request
+"""
+import os
+import threading
+from types import MappingProxyType
+
+import yaml
+
+from api import __location__
+from api.util.julian import compile_restriction
+
+RESTRICTED_YAML = os.path.join(__location__, 'domain/restricted.yaml')
+
+
+def _freeze(value):
+    """ Read-only copy of parsed yaml: mappings, tuples and scalars """
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class RestrictionIndex(object):
+    """
+    Product restrictions, per sensor (tm5, etm7, olitirs8, ...)
+
+    Sensor role and date restrictions already include those listed
+    under 'all', which override any sensor related dates
+    """
+    def __init__(self, data, mtime=None):
+        self.mtime = mtime
+        self.data = _freeze(data)
+
+        restrict_all = data.get('all', {})
+        all_role = restrict_all.get('role', [])
+        all_by_date = restrict_all.get('by_date', {})
+
+        # sensors restricted from ordering entirely
+        self.ordering = frozenset(restrict_all.get('ordering', []))
+
+        # {sensor: frozenset(products only staff may order)}
+        self.all_role = frozenset(all_role)
+        self.roles = MappingProxyType({name: frozenset(v.get('role', []) + all_role)
+                                       for name, v in data.items()})
+
+        # {sensor: {product: DateRestriction}}
+        self.all_by_date = MappingProxyType({p: compile_restriction(r)
+                                             for p, r in all_by_date.items()})
+        self.dates = MappingProxyType({name: MappingProxyType(
+                                           {p: compile_restriction(r)
+                                            for p, r in dict(v.get('by_date', {}), **all_by_date).items()})
+                                       for name, v in data.items()})
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def role(self, sensor_name):
+        """
+        Products only staff may order for the sensor
+
+        :param sensor_name: restricted.yaml sensor name, e.g. etm7
+        :return: frozenset
+        """
+        return self.roles.get(sensor_name, self.all_role)
+
+    def by_date(self, sensor_name):
+        """
+        Date restricted products for the sensor
+
+        :param sensor_name: restricted.yaml sensor name, e.g. etm7
+        :return: read-only dict, {product: DateRestriction}
+        """
+        return self.dates.get(sensor_name, self.all_by_date)
+
+    def date_restriction(self, sensor_name, product):
+        """
+        :return: DateRestriction, or None if the product is not restricted
+        """
+        return self.by_date(sensor_name).get(product)
+
+
+def load(path=None):
+    """
+    Parse a restrictions file, bypassing the shared index
+
+    :param path: yaml file, defaults to domain/restricted.yaml
+    :return: RestrictionIndex
+    """
+    path = path or RESTRICTED_YAML
+    mtime = os.stat(path).st_mtime_ns
+    with open(path) as f:
+        return RestrictionIndex(yaml.safe_load(f.read()), mtime)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def index():
+    """
+    The shared RestrictionIndex for domain/restricted.yaml
+
+    :return: RestrictionIndex
+    """
+    global _index
+    mtime = os.stat(RESTRICTED_YAML).st_mtime_ns
+    current = _index
+    if current is None or current.mtime != mtime:
+        with _index_lock:
+            if _index is None or _index.mtime != mtime:
+                _index = load(RESTRICTED_YAML)
+            current = _index
+    return current
@@ -1,7 +1,9 @@
 """ Holds domain objects for scenes """
 
 from api.util.dbconnect import DBConnectException, db_instance
+import psycopg2
 import psycopg2.extensions as db_extns
+import psycopg2.extras as db_extras
 from api.system.logger import ilogger as logger
 from api.domain import format_sql_params
 
@@ -20,6 +22,33 @@ class Scene(object):
                 'FROM ordering_scene '
                 'WHERE ')
 
+    # columns written by save(), status_modified is maintained by a trigger
+    save_cols = ('status', 'cksum_download_url', 'log_file_contents',
+                 'processing_location', 'retry_after', 'job_name',
+                 'note', 'retry_count', 'sensor_type',
+                 'product_dload_url', 'tram_order_id',
+                 'completion_date', 'ee_unit_id', 'retry_limit',
+                 'cksum_distro_location', 'product_distro_location',
+                 'reported_orphan', 'orphaned', 'failed_lta_status_update',
+                 'download_size')
+
+    # postgres types for save_cols, needed to cast the VALUES list in save_many
+    col_types = {'status': 'varchar', 'cksum_download_url': 'varchar',
+                 'log_file_contents': 'text', 'processing_location': 'varchar',
+                 'retry_after': 'timestamp', 'job_name': 'varchar',
+                 'note': 'varchar', 'retry_count': 'integer',
+                 'sensor_type': 'varchar', 'product_dload_url': 'varchar',
+                 'tram_order_id': 'varchar', 'completion_date': 'timestamp',
+                 'ee_unit_id': 'integer', 'retry_limit': 'integer',
+                 'cksum_distro_location': 'varchar',
+                 'product_distro_location': 'varchar',
+                 'reported_orphan': 'timestamp', 'orphaned': 'boolean',
+                 'failed_lta_status_update': 'varchar',
+                 'download_size': 'bigint'}
+
+    # ordering_order columns returned alongside scenes by with_orders
+    order_cols = ('orderid', 'status', 'order_source', 'ee_order_id')
+
     def __init__(self, id=None, name=None, note=None, order_id=None,
                  product_distro_location=None, product_dload_url=None,
                  cksum_distro_location=None, cksum_download_url=None,
@@ -84,6 +113,7 @@ class Scene(object):
         self.download_size = download_size
         self.failed_lta_status_update = failed_lta_status_update
         self.status_modified = status_modified
+        self._mark_clean()
 
         if id:
             # no need to query the DB again
@@ -295,6 +325,58 @@ class Scene(object):
         else:
             return resp
 
+    @classmethod
+    def with_order(cls, name, orderid):
+        """
+        Load a scene along with the columns of its order in one query
+
+        :param name: scene/collection id
+        :param orderid: long name for the related order
+        :return: (Scene, dict of order columns), or (None, None) if not found
+        """
+        return cls.with_orders([(name, orderid)]).get((name, orderid), (None, None))
+
+    @classmethod
+    def with_orders(cls, pairs):
+        """
+        Load scenes along with the columns of their order which the
+        production updates need, in a single query
+
+        :param pairs: list of (scene name, order long name) tuples
+        :return: dict of (name, orderid): (Scene, dict of order columns)
+        """
+        if not pairs:
+            return {}
+
+        sql = ('SELECT ordering_scene.*, {} '
+               'FROM ordering_scene '
+               'JOIN ordering_order '
+               'ON ordering_order.id = ordering_scene.order_id '
+               'WHERE (ordering_scene.name, ordering_order.orderid) IN %s'
+               .format(', '.join('ordering_order.{0} AS order__{0}'.format(c)
+                                 for c in cls.order_cols)))
+        args = (tuple((str(n), str(o)) for n, o in set(pairs)),)
+
+        ret = {}
+        log_sql = ''
+        try:
+            with db_instance() as db:
+                log_sql = db.cursor.mogrify(sql, args)
+                logger.info('scene.py with_orders sql: {}'.format(log_sql))
+                db.select(sql, args)
+                for i in db:
+                    sd = dict(i)
+                    order = {c: sd.pop('order__{}'.format(c))
+                             for c in cls.order_cols}
+                    ret[(sd['name'], order['orderid'])] = (Scene(**sd), order)
+        except DBConnectException as e:
+            num, message = e.args
+            logger.critical('Error retrieving scenes with orders: {}\n'
+                            'sql: {}'.format(message, log_sql))
+            raise SceneException(e)
+
+        return ret
+
     @classmethod
     def bulk_update(cls, ids=None, updates=None):
         """
@@ -361,39 +443,38 @@ class Scene(object):
                                  .format(message, log_sql))
 
         self.__setattr__(att, val)
+        if att in self._persisted:
+            self._persisted[att] = val
 
         return self.__getattribute__(att)
 
     def save(self):
         """
-        Save the current configuration of the scene object to the DB
+        Save the changed attributes of the scene object to the DB, picking
+        up any values set by the database (status_modified) on the way back
         """
-        sql = 'UPDATE ordering_scene SET %s = %s WHERE id = %s'
+        dirty = self.dirty_fields()
+        if not dirty:
+            return
 
-        attr_tup = ('status', 'cksum_download_url', 'log_file_contents',
-                    'processing_location', 'retry_after', 'job_name',
-                    'note', 'retry_count', 'sensor_type',
-                    'product_dload_url', 'tram_order_id',
-                    'completion_date', 'ee_unit_id', 'retry_limit',
-                    'cksum_distro_location', 'product_distro_location',
-                    'reported_orphan', 'orphaned', 'failed_lta_status_update',
-                    'download_size', 'status_modified')
+        sql = ('UPDATE ordering_scene SET {} WHERE id = %s RETURNING {}'
+               .format(', '.join('{} = %s'.format(c) for c in dirty),
+                       ', '.join(self.save_cols + ('status_modified',))))
 
-        vals = tuple(self.__getattribute__(v) for v in attr_tup)
-        cols = '({})'.format(','.join(attr_tup))
+        vals = tuple(self.__getattribute__(v) for v in dirty)
 
         log_sql = ''
         try:
             with db_instance() as db:
-                log_sql = db.cursor.mogrify(sql, (db_extns.AsIs(cols),
-                                                  vals, self.id))
+                log_sql = db.cursor.mogrify(sql, vals + (self.id,))
 
-                db.execute(sql, (db_extns.AsIs(cols), vals, self.id))
+                db.execute(sql, vals + (self.id,))
                 db.commit()
+                new = dict(db[0]) if db else None
                 msg = f"\n*** Saved updates to scene id: {self.id}\n" \
                       f"name: {self.name}\n" \
                       f"sql: {log_sql}\n" \
-                      f"args: {list(zip(attr_tup, vals))}\n***"
+                      f"args: {list(zip(dirty, vals))}\n***"
                 logger.info(msg)
 
         except DBConnectException as e:
@@ -402,10 +483,74 @@ class Scene(object):
                             "sql: {}".format(message, log_sql))
             raise SceneException(e)
 
-        new = Scene.where({'id': self.id})[0]
+        if new is None:
+            raise SceneException('Error saving scene, id {} not found'
+                                 .format(self.id))
+
+        for att, val in new.items():
+            self.__setattr__(att, val)
+        self._mark_clean()
+
+    @classmethod
+    def save_many(cls, scenes):
+        """
+        Save the changed attributes of many scenes, with one
+        UPDATE ... FROM (VALUES ...) per distinct set of changed columns
+
+        :param scenes: list of Scene objects
+        """
+        groups = {}
+        for scene in scenes:
+            dirty = scene.dirty_fields()
+            if dirty:
+                groups.setdefault(dirty, []).append(scene)
+
+        for dirty, group in groups.items():
+            sql = ('UPDATE ordering_scene SET {} '
+                   'FROM (VALUES %s) AS v (id, {}) '
+                   'WHERE ordering_scene.id = v.id '
+                   'RETURNING ordering_scene.id, {}'
+                   .format(', '.join('{0} = v.{0}'.format(c) for c in dirty),
+                           ', '.join(dirty),
+                           ', '.join(cls.save_cols + ('status_modified',))))
+            template = '(%s, {})'.format(', '.join('%s::{}'.format(cls.col_types[c])
+                                                   for c in dirty))
+            values = [(s.id,) + tuple(s.__getattribute__(c) for c in dirty)
+                      for s in group]
+            by_id = {s.id: s for s in group}
+
+            try:
+                with db_instance() as db:
+                    rows = db_extras.execute_values(db.cursor, sql, values,
+                                                    template=template,
+                                                    fetch=True)
+                    db.commit()
+                    logger.info('\n*** Saved updates to {} scenes, columns: {}\n***'
+                                .format(len(rows), dirty))
+            except (DBConnectException, psycopg2.Error) as e:
+                logger.critical('Error saving scenes: {}\ncolumns: {}'
+                                .format(e, dirty))
+                raise SceneException(e)
+
+            for row in rows:
+                scene = by_id[row['id']]
+                for att, val in dict(row).items():
+                    scene.__setattr__(att, val)
+                scene._mark_clean()
+
+    def dirty_fields(self):
+        """
+        Columns which have been modified since the scene was loaded
+        or last saved
+
+        :return: tuple of column names
+        """
+        return tuple(c for c in self.save_cols
+                     if self.__getattribute__(c) != self._persisted.get(c))
 
-        for att in attr_tup:
-            self.__setattr__(att, new.__getattribute__(att))
+    def _mark_clean(self):
+        self._persisted = {c: self.__getattribute__(c)
+                           for c in self.save_cols}
 
     def order_attr(self, col):
         """
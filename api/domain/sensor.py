@@ -6,28 +6,28 @@ Author: David V. Hill
 import os
 import re
 from collections import namedtuple
+from functools import lru_cache
 
 import yaml
 
 from api import ProductNotImplemented, __location__
-from api.util import julian_date_check, julian_from_date
+from api.util import julian_from_date
+from api.domain import restrictions
 from api.system.logger import ilogger as logger
 
-# Grab details on product restrictions
-# Do it here, vs during object instantiation,
-# to avoid needless repetition
-with open(os.path.join(__location__, 'domain/restricted.yaml')) as f:
-    restricted = yaml.safe_load(f.read())
-
 # Grab human-readable product names/categories
 with open(os.path.join(__location__, 'domain/products.yaml')) as f:
     products = yaml.safe_load(f.read())
 
+# Number of parsed product ids each process keeps around
+PARSE_CACHE_SIZE = 50000
+
 
 class ProductNames(object):
     def groups(self, staff_role=False):
         """ Gives human-readable mappings and logical-groups to all orderable products"""
         retdata = dict()
+        restricted = restrictions.index()
         for category_name in products['categories']:
             if category_name not in retdata:
                 retdata[category_name] = products['categories'][category_name]
@@ -66,21 +66,55 @@ class ProductNames(object):
 AllProducts = ProductNames().get()
 
 
+class lazy_property(object):
+    """
+    Read-only property which is only computed the first time it is used,
+    the value is then kept in the instance's '_<name>' slot
+    """
+    def __init__(self, func):
+        self.func = func
+        self.slot = '_' + func.__name__
+        self.__doc__ = func.__doc__
+
+    def __get__(self, inst, owner):
+        if inst is None:
+            return self
+        try:
+            return getattr(inst, self.slot)
+        except AttributeError:
+            value = self.func(inst)
+            # bypass the read-only check, this is a cache not a change
+            object.__setattr__(inst, self.slot, value)
+            return value
+
+
 class SensorProduct(object):
     """Base class for all sensor products"""
 
-    # landsat sceneid, modis tile name, aster granule id, etc.
-    product_id = None
+    # Many thousands of these are held while validating large orders, so
+    # instances carry no __dict__, every subclass declares __slots__ too
+    __slots__ = (
+        # landsat sceneid, modis tile name, aster granule id, etc.
+        'product_id',
+
+        # lt05, le07, mod, myd, etc
+        'sensor_code',
+
+        # four digits
+        'year',
 
-    # lt05, le07, mod, myd, etc
-    sensor_code = None
+        # key into SensorCONST.instances, set by instance()
+        'shortname',
+
+        '_frozen',
+    )
+
+    # attributes shown by repr, in order
+    _fields = ('product_id', 'sensor_code', 'shortname')
 
     # tm, etm, terra, aqua, etc
     sensor_name = None
 
-    # four digits
-    year = None
-
     # three digits
     doy = None
 
@@ -107,14 +141,39 @@ class SensorProduct(object):
         self.product_id = product_id
         self.sensor_code = product_id[0:3]
 
+    def __setattr__(self, name, value):
+        # instances handed out by instance() are shared, so are read-only
+        if getattr(self, '_frozen', False):
+            raise AttributeError('{} attributes are read-only'
+                                 .format(type(self).__name__))
+        super(SensorProduct, self).__setattr__(name, value)
+
+    def freeze(self):
+        """ Prevent any further changes to the product's attributes """
+        object.__setattr__(self, '_frozen', True)
+
+    def fields(self):
+        """ Parsed attributes of the product, used for its repr """
+        values = dict()
+        for name in self._fields:
+            try:
+                values[name] = getattr(self, name)
+            except AttributeError:
+                # e.g. shortname, on products not built by instance()
+                pass
+        return values
+
 
 class Modis(SensorProduct):
     """Superclass for all Modis products"""
-    short_name = None
-    horizontal = None
-    vertical = None
-    date_acquired = None
-    date_produced = None
+    __slots__ = ('short_name', 'horizontal', 'vertical', 'date_acquired',
+                 'date_produced', 'version', '_doy', '_lta_json_name')
+
+    _fields = ('product_id', 'sensor_code', 'short_name', 'date_acquired',
+               'year', 'doy', 'horizontal', 'vertical', 'version',
+               'date_produced', 'lta_json_name', 'shortname')
+
+    lta_json_format = None
     input_filename_extension = '.hdf'
     l1_provider = 'lpdaac'
 
@@ -126,24 +185,32 @@ class Modis(SensorProduct):
         self.short_name = parts[0]
         self.date_acquired = parts[1][1:]
         self.year = self.date_acquired[0:4]
-        self.doy = self.date_acquired[4:8]
 
         __hv = parts[2]
         self.horizontal = __hv[1:3]
         self.vertical = __hv[4:6]
         self.version = parts[3]
         self.date_produced = parts[4]
-        self.lta_json_name = self.lta_json_name.format(collection=int(self.version))
+
+    @lazy_property
+    def doy(self):
+        return self.date_acquired[4:8]
+
+    @lazy_property
+    def lta_json_name(self):
+        name = self.lta_json_format.format(collection=int(self.version))
         if int(self.version) == 5:
             # MODIS Version 5 dataset does not have a version...
-            self.lta_json_name = self.lta_json_name.replace('_V5', '')
+            name = name.replace('_V5', '')
+        return name
 
     def __repr__(self):
-        return 'MODIS: {}'.format(self.__dict__)
+        return 'MODIS: {}'.format(self.fields())
 
 
 class Terra(Modis):
     """Superclass for Terra based Modis products"""
+    __slots__ = ()
 
     sensor_name = 'terra'
     products = [AllProducts.l1, AllProducts.stats]
@@ -151,12 +218,14 @@ class Terra(Modis):
 
 class Aqua(Modis):
     """Superclass for Aqua based Modis products"""
+    __slots__ = ()
     sensor_name = 'aqua'
     products = [AllProducts.l1, AllProducts.stats]
 
 
 class Modis09A1(Modis):
     """models modis 09A1"""
+    __slots__ = ()
     default_resolution_m = 500
     default_resolution_dd = 0.00449155
     default_rows = 2400
@@ -165,6 +234,7 @@ class Modis09A1(Modis):
 
 class Modis09GA(Modis):
     """models modis 09GA"""
+    __slots__ = ()
     default_resolution_m = 1000
     default_resolution_dd = 0.0089831
     default_rows = 1200
@@ -173,6 +243,7 @@ class Modis09GA(Modis):
 
 class Modis09GQ(Modis):
     """models modis 09GQ"""
+    __slots__ = ()
     default_resolution_m = 250
     default_resolution_dd = 0.002245775
     default_rows = 4800
@@ -181,6 +252,7 @@ class Modis09GQ(Modis):
 
 class Modis09Q1(Modis):
     """models modis 09Q1"""
+    __slots__ = ()
     default_resolution_m = 250
     default_resolution_dd = 0.002245775
     default_rows = 4800
@@ -189,6 +261,7 @@ class Modis09Q1(Modis):
 
 class Modis13A1(Modis):
     """models modis 13A1"""
+    __slots__ = ()
     default_resolution_m = 500
     default_resolution_dd = 0.00449155
     default_rows = 2400
@@ -197,6 +270,7 @@ class Modis13A1(Modis):
 
 class Modis13A2(Modis):
     """models modis 13A2"""
+    __slots__ = ()
     default_resolution_m = 1000
     default_resolution_dd = 0.0089831
     default_rows = 1200
@@ -205,6 +279,7 @@ class Modis13A2(Modis):
 
 class Modis13A3(Modis):
     """models modis 13A3"""
+    __slots__ = ()
     default_resolution_m = 1000
     default_resolution_dd = 0.0089831
     default_rows = 1200
@@ -213,6 +288,7 @@ class Modis13A3(Modis):
 
 class Modis13Q1(Modis):
     """models modis 13Q1"""
+    __slots__ = ()
     default_resolution_m = 250
     default_resolution_dd = 0.002245775
     default_rows = 4800
@@ -221,6 +297,7 @@ class Modis13Q1(Modis):
 
 class Modis11A1(Modis):
     """models modis 11A1"""
+    __slots__ = ()
     default_resolution_m = 1000
     default_resolution_dd = 0.0089831
     default_rows = 1200
@@ -229,103 +306,122 @@ class Modis11A1(Modis):
 
 class ModisTerra09A1(Terra, Modis09A1):
     """models modis 09A1 from Terra"""
-    lta_json_name = 'MODIS_MOD09A1_V{collection}'
+    __slots__ = ()
+    lta_json_format = 'MODIS_MOD09A1_V{collection}'
 
 
 class ModisTerra09GA(Terra, Modis09GA):
     """models modis 09GA from Terra"""
-    lta_json_name = 'MODIS_MOD09GA_V{collection}'
+    __slots__ = ()
+    lta_json_format = 'MODIS_MOD09GA_V{collection}'
     products = [AllProducts.l1, AllProducts.stats, AllProducts.modis_ndvi]
 
 
 class ModisTerra09GQ(Terra, Modis09GQ):
     """models modis 09GQ from Terra"""
-    lta_json_name = 'MODIS_MOD09GQ_V{collection}'
+    __slots__ = ()
+    lta_json_format = 'MODIS_MOD09GQ_V{collection}'
 
 
 class ModisTerra09Q1(Terra, Modis09Q1):
     """models modis 09Q1 from Terra"""
-    lta_json_name = 'MODIS_MOD09Q1_V{collection}'
+    __slots__ = ()
+    lta_json_format = 'MODIS_MOD09Q1_V{collection}'
 
 
 class ModisTerra13A1(Terra, Modis13A1):
     """models modis 13A1 from Terra"""
-    lta_json_name = 'MODIS_MOD13A1_V{collection}'
+    __slots__ = ()
+    lta_json_format = 'MODIS_MOD13A1_V{collection}'
 
 
 class ModisTerra13A2(Terra, Modis13A2):
     """models modis 13A2 from Terra"""
-    lta_json_name = 'MODIS_MOD13A2_V{collection}'
+    __slots__ = ()
+    lta_json_format = 'MODIS_MOD13A2_V{collection}'
 
 
 class ModisTerra13A3(Terra, Modis13A3):
     """models modis 13A3 from Terra"""
-    lta_json_name = 'MODIS_MOD13A3_V{collection}'
+    __slots__ = ()
+    lta_json_format = 'MODIS_MOD13A3_V{collection}'
 
 
 class ModisTerra13Q1(Terra, Modis13Q1):
     """models modis 13Q1 from Terra"""
-    lta_json_name = 'MODIS_MOD13Q1_V{collection}'
+    __slots__ = ()
+    lta_json_format = 'MODIS_MOD13Q1_V{collection}'
 
 
 class ModisTerra11A1(Terra, Modis11A1):
     """models modis 11A1 from Terra"""
-    lta_json_name = 'MODIS_MOD11A1_V{collection}'
+    __slots__ = ()
+    lta_json_format = 'MODIS_MOD11A1_V{collection}'
 
 
 class ModisAqua09A1(Aqua, Modis09A1):
     """models modis 09A1 from Aqua"""
-    lta_json_name = 'MODIS_MYD09A1_V{collection}'
+    __slots__ = ()
+    lta_json_format = 'MODIS_MYD09A1_V{collection}'
 
 
 class ModisAqua09GA(Aqua, Modis09GA):
     """models modis 09GA from Aqua"""
-    lta_json_name = 'MODIS_MYD09GA_V{collection}'
+    __slots__ = ()
+    lta_json_format = 'MODIS_MYD09GA_V{collection}'
     products = [AllProducts.l1, AllProducts.stats, AllProducts.modis_ndvi]
 
 
 class ModisAqua09GQ(Aqua, Modis09GQ):
     """models modis 09GQ from Aqua"""
-    lta_json_name = 'MODIS_MYD09GQ_V{collection}'
+    __slots__ = ()
+    lta_json_format = 'MODIS_MYD09GQ_V{collection}'
 
 
 class ModisAqua09Q1(Aqua, Modis09Q1):
     """models modis 09Q1 from Aqua"""
-    lta_json_name = 'MODIS_MYD09Q1_V{collection}'
+    __slots__ = ()
+    lta_json_format = 'MODIS_MYD09Q1_V{collection}'
 
 
 class ModisAqua13A1(Aqua, Modis13A1):
     """models modis 13A1 from Aqua"""
-    lta_json_name = 'MODIS_MYD13A1_V{collection}'
+    __slots__ = ()
+    lta_json_format = 'MODIS_MYD13A1_V{collection}'
 
 
 class ModisAqua13A2(Aqua, Modis13A2):
     """models modis 13A2 from Aqua"""
-    lta_json_name = 'MODIS_MYD13A2_V{collection}'
+    __slots__ = ()
+    lta_json_format = 'MODIS_MYD13A2_V{collection}'
 
 
 class ModisAqua13A3(Aqua, Modis13A3):
     """models modis 13A3 from Aqua"""
-    lta_json_name = 'MODIS_MYD13A3_V{collection}'
+    __slots__ = ()
+    lta_json_format = 'MODIS_MYD13A3_V{collection}'
 
 
 class ModisAqua13Q1(Aqua, Modis13Q1):
     """models modis 13Q1 from Aqua"""
-    lta_json_name = 'MODIS_MYD13Q1_V{collection}'
+    __slots__ = ()
+    lta_json_format = 'MODIS_MYD13Q1_V{collection}'
 
 
 class ModisAqua11A1(Aqua, Modis11A1):
     """models modis 11A1 from Aqua"""
-    lta_json_name = 'MODIS_MYD11A1_V{collection}'
+    __slots__ = ()
+    lta_json_format = 'MODIS_MYD11A1_V{collection}'
 
 
 class Viirs(SensorProduct):
     """Superclass for all VIIRS products"""
-    short_name = None
-    horizontal = None
-    vertical = None
-    date_acquired = None
-    date_produced = None
+    __slots__ = ('short_name', 'horizontal', 'vertical', 'date_acquired',
+                 'date_produced', 'version', '_doy', '_lta_json_name')
+
+    _fields = Modis._fields
+
+    lta_json_format = None
     input_filename_extension = '.h5'
     l1_provider = 'lpdaac'
 
@@ -337,37 +433,51 @@ class Viirs(SensorProduct):
         self.short_name = parts[0]
         self.date_acquired = parts[1][1:]
         self.year = self.date_acquired[0:4]
-        self.doy = self.date_acquired[4:8]
 
         __hv = parts[2]
         self.horizontal = __hv[1:3]
         self.vertical = __hv[4:6]
         self.version = parts[3]
         self.date_produced = parts[4]
-        self.lta_json_name = self.lta_json_name.format(collection=int(self.version))
+
+    @lazy_property
+    def doy(self):
+        return self.date_acquired[4:8]
+
+    @lazy_property
+    def lta_json_name(self):
+        return self.lta_json_format.format(collection=int(self.version))
 
     def __repr__(self):
-        return 'VIIRS: {}'.format(self.__dict__)
+        return 'VIIRS: {}'.format(self.fields())
 
 
 class Viirs09GA(Viirs):
     """models VIIRS VNP09GA"""
+    __slots__ = ()
     default_resolution_m = 500
     default_resolution_dd = 0.00449155
     default_rows = 2400
     default_cols = 2400
     sensor_name = 'viirs'
 
-    lta_json_name = 'VIIRS_VNP09GA'
+    lta_json_format = 'VIIRS_VNP09GA'
     products = [AllProducts.l1, AllProducts.stats, AllProducts.viirs_ndvi]
 
 
 class Landsat(SensorProduct):
     """Superclass for all landsat based products"""
-    path = None
-    row = None
+    __slots__ = ('path', 'row', 'correction_level', 'collection_number',
+                 'collection_category', '_acquired', '_doy', '_julian',
+                 '_lta_json_name')
+
+    _fields = ('product_id', 'sensor_code', 'year', 'doy', 'julian', 'path',
+               'row', 'correction_level', 'collection_number',
+               'collection_category', 'lta_json_name', 'shortname')
+
     station = None
     lta_product_code = None
+    lta_json_format = None
     default_resolution_m = 30
     default_resolution_dd = 0.0002695
     default_rows = 11000
@@ -380,31 +490,39 @@ class Landsat(SensorProduct):
         super(Landsat, self).__init__(product_id)
 
         _idlist = product_id.split('_')
+        self._acquired = _idlist[3]
         self.year = _idlist[3][:4]
-        self.doy = julian_from_date(_idlist[3][:4], _idlist[3][4:6], _idlist[3][6:8])
-        self.julian = self.year + self.doy
         self.path = _idlist[2][:3].lstrip('0')
         self.row = _idlist[2][3:].lstrip('0')
         self.correction_level = _idlist[1]
         self.collection_number = _idlist[-2]
         self.collection_category = _idlist[-1]
-        self.lta_json_name = self.lta_json_name.format(collection=int(self.collection_number))
+
+    @lazy_property
+    def doy(self):
+        return julian_from_date(self._acquired[:4], self._acquired[4:6], self._acquired[6:8])
+
+    @lazy_property
+    def julian(self):
+        return self.year + self.doy
+
+    @lazy_property
+    def lta_json_name(self):
+        return self.lta_json_format.format(collection=int(self.collection_number))
 
     def __repr__(self):
-        return 'Landsat: {}'.format(self.__dict__)
+        return 'Landsat: {}'.format(self.fields())
 
     # SR based products are not available for those
     # dates where we are missing auxiliary data
     def sr_date_restricted(self):
-        if self.sensor_name in restricted:
-            if 'by_date' in restricted[self.sensor_name].keys():
-                if not julian_date_check(self.julian, restricted[self.sensor_name]['by_date']['sr']):
-                    return True
-        return False
+        restriction = restrictions.index().date_restriction(self.sensor_name, 'sr')
+        return restriction is not None and not restriction.allows(self.julian)
 
 
 class LandsatTM(Landsat):
     """Models Landsat TM only products"""
+    __slots__ = ()
     products = [AllProducts.source_metadata, AllProducts.l1, AllProducts.toa, AllProducts.bt, AllProducts.sr,
                 AllProducts.st, AllProducts.swe,
                 AllProducts.sr_ndvi, AllProducts.sr_evi, AllProducts.sr_savi, AllProducts.sr_msavi, AllProducts.sr_ndmi,
@@ -413,7 +531,7 @@ class LandsatTM(Landsat):
                 AllProducts.reanalsrc_narr, AllProducts.reanalsrc_merra2, AllProducts.reanalsrc_fp,
                 AllProducts.reanalsrc_fpit]
     lta_name = 'LANDSAT_TM'
-    lta_json_name = 'LANDSAT_TM_C{collection}'
+    lta_json_format = 'LANDSAT_TM_C{collection}'
     sensor_name = 'tm'
 
     def __init__(self, product_id):
@@ -422,6 +540,7 @@ class LandsatTM(Landsat):
 
 class LandsatETM(Landsat):
     """Models Landsat ETM only products"""
+    __slots__ = ()
     products = [AllProducts.source_metadata, AllProducts.l1, AllProducts.toa, AllProducts.bt, AllProducts.sr,
                 AllProducts.st, AllProducts.swe,
                 AllProducts.sr_ndvi, AllProducts.sr_evi, AllProducts.sr_savi, AllProducts.sr_msavi, AllProducts.sr_ndmi,
@@ -430,7 +549,7 @@ class LandsatETM(Landsat):
                 AllProducts.reanalsrc_narr, AllProducts.reanalsrc_merra2, AllProducts.reanalsrc_fp,
                 AllProducts.reanalsrc_fpit]
     lta_name = 'LANDSAT_ETM_PLUS'
-    lta_json_name = 'LANDSAT_ETM_C{collection}'
+    lta_json_format = 'LANDSAT_ETM_C{collection}'
     sensor_name = 'etm'
 
     def __init__(self, product_id):
@@ -439,6 +558,7 @@ class LandsatETM(Landsat):
 
 class LandsatOLITIRS(Landsat):
     """Models Landsat OLI/TIRS only products"""
+    __slots__ = ()
     products = [AllProducts.source_metadata, AllProducts.l1, AllProducts.toa, AllProducts.bt, AllProducts.sr,
                 AllProducts.st, AllProducts.swe,
                 AllProducts.sr_ndvi, AllProducts.sr_evi, AllProducts.sr_savi, AllProducts.sr_msavi, AllProducts.sr_ndmi,
@@ -449,7 +569,7 @@ class LandsatOLITIRS(Landsat):
                 AllProducts.reanalsrc_fpit,
                 AllProducts.aq_refl]
     lta_name = 'LANDSAT_8'
-    lta_json_name = 'LANDSAT_8_C{collection}'
+    lta_json_format = 'LANDSAT_8_C{collection}'
     sensor_name = 'olitirs'
 
     def __init__(self, product_id):
@@ -458,10 +578,11 @@ class LandsatOLITIRS(Landsat):
 
 class LandsatOLI(Landsat):
     """Models Landsat OLI only products"""
+    __slots__ = ()
     products = [AllProducts.source_metadata, AllProducts.l1, AllProducts.toa, AllProducts.aq_refl,
                 AllProducts.stats, AllProducts.pixel_qa]
     lta_name = 'LANDSAT_8'
-    lta_json_name = 'LANDSAT_8_C{collection}'
+    lta_json_format = 'LANDSAT_8_C{collection}'
     sensor_name = 'oli'
 
     def __init__(self, product_id):
@@ -470,8 +591,9 @@ class LandsatOLI(Landsat):
 
 class LandsatTIRS(Landsat):
     """Models Landsat TIRS only products"""
+    __slots__ = ()
     lta_name = 'LANDSAT_8'
-    lta_json_name = 'LANDSAT_8_C{collection}'
+    lta_json_format = 'LANDSAT_8_C{collection}'
     sensor_name = 'tirs'
 
     def __init__(self, product_id):
@@ -480,6 +602,7 @@ class LandsatTIRS(Landsat):
 
 class Landsat4(Landsat):
     """Models Landsat 4 only products"""
+    __slots__ = ()
 
     def __init__(self, product_id):
         super(Landsat4, self).__init__(product_id)
@@ -487,6 +610,7 @@ class Landsat4(Landsat):
 
 class Landsat4TM(LandsatTM, Landsat4):
     """Models Landsat 4 TM only products"""
+    __slots__ = ()
     sensor_name = 'tm4'
 
     def __init__(self, product_id):
@@ -495,6 +619,7 @@ class Landsat4TM(LandsatTM, Landsat4):
 
 class Landsat5(Landsat):
     """Models Landsat 5 only products"""
+    __slots__ = ()
 
     def __init__(self, product_id):
         super(Landsat5, self).__init__(product_id)
@@ -502,6 +627,7 @@ class Landsat5(Landsat):
 
 class Landsat5TM(LandsatTM, Landsat5):
     """Models Landsat 5 TM only products"""
+    __slots__ = ()
     sensor_name = 'tm5'
 
     def __init__(self, product_id):
@@ -510,6 +636,7 @@ class Landsat5TM(LandsatTM, Landsat5):
 
 class Landsat7(Landsat):
     """Models Landsat 7 only products"""
+    __slots__ = ()
 
     def __init__(self, product_id):
         super(Landsat7, self).__init__(product_id)
@@ -517,6 +644,7 @@ class Landsat7(Landsat):
 
 class Landsat7ETM(LandsatETM, Landsat7):
     """Models Landsat 7 ETM only products"""
+    __slots__ = ()
     sensor_name = 'etm7'
 
     def __init__(self, product_id):
@@ -525,6 +653,7 @@ class Landsat7ETM(LandsatETM, Landsat7):
 
 class Landsat8(Landsat):
     """Models Landsat 8 only products"""
+    __slots__ = ()
 
     def __init__(self, product_id):
         super(Landsat8, self).__init__(product_id)
@@ -532,6 +661,7 @@ class Landsat8(Landsat):
 
 class Landsat8OLI(LandsatOLI, Landsat8):
     """Models Landsat 8 OLI only products"""
+    __slots__ = ()
     sensor_name = 'oli8'
 
     def __init__(self, product_id):
@@ -540,6 +670,7 @@ class Landsat8OLI(LandsatOLI, Landsat8):
 
 class Landsat8TIRS(LandsatTIRS, Landsat8):
     """Models Landsat 8 TIRS only products"""
+    __slots__ = ()
     sensor_name = 'tirs8'
 
     def __init__(self, product_id):
@@ -548,6 +679,7 @@ class Landsat8TIRS(LandsatTIRS, Landsat8):
 
 class Landsat8OLITIRS(LandsatOLITIRS, Landsat8):
     """Models Landsat 8 OLI/TIRS only products"""
+    __slots__ = ()
     sensor_name = 'olitirs8'
 
     def __init__(self, product_id):
@@ -556,7 +688,11 @@ class Landsat8OLITIRS(LandsatOLITIRS, Landsat8):
 
 class Sentinel2(SensorProduct):
     """Superclass for all sentinel based products"""
-    tile = None
+    __slots__ = ('tile', '_acquired', '_doy', '_julian')
+
+    _fields = ('product_id', 'sensor_code', 'year', 'doy', 'julian', 'tile',
+               'shortname')
+
     station = None
     lta_product_code = None
     # These values are valid for the current LaSRC output for S2
@@ -574,17 +710,15 @@ class Sentinel2(SensorProduct):
 
         id_len = self.check_id(product_id)
 
-        if id_len is 'short':
+        if id_len == 'short':
             _idlist = product_id.split('_')
+            self._acquired = _idlist[3][:8]
             self.year = _idlist[3][:4]
-            self.doy = julian_from_date(self.year, _idlist[3][4:6], _idlist[3][6:8])
-            self.julian = self.year + self.doy
             self.tile = _idlist[1]
 
-        elif id_len is 'long':
+        elif id_len == 'long':
+            self._acquired = product_id[25:33]
             self.year = product_id[25:29]
-            self.doy = julian_from_date(self.year, product_id[29:31], product_id[31:33])
-            self.julian = self.year + self.doy
             self.tile = product_id[66:71]
 
         else:
@@ -592,17 +726,22 @@ class Sentinel2(SensorProduct):
             logger.exception(msg)
             raise ProductNotImplemented(product_id)
 
+    @lazy_property
+    def doy(self):
+        return julian_from_date(self._acquired[:4], self._acquired[4:6], self._acquired[6:8])
+
+    @lazy_property
+    def julian(self):
+        return self.year + self.doy
+
     def __repr__(self):
-        return 'Sentinel: {}'.format(self.__dict__)
+        return 'Sentinel: {}'.format(self.fields())
 
     # LaSRC products are not available for those
     # dates where we are missing auxiliary data
     def sr_date_restricted(self):
-        if self.sensor_name in restricted:
-            if 'by_date' in restricted[self.sensor_name].keys():
-                if not julian_date_check(self.julian, restricted[self.sensor_name]['by_date']['sr']):
-                    return True
-        return False
+        restriction = restrictions.index().date_restriction(self.sensor_name, 'sr')
+        return restriction is not None and not restriction.allows(self.julian)
 
     def check_id(self, product_id):
         """
@@ -618,6 +757,7 @@ class Sentinel2(SensorProduct):
 
 class Sentinel2_AB(Sentinel2):
     """Superclass for all sentinel 2-AB based products"""
+    __slots__ = ()
 
     # used by restricted.yaml
     # current restrictions for Sentinel-2 are date
@@ -638,16 +778,13 @@ class Sentinel2_AB(Sentinel2):
         super(Sentinel2_AB, self).__init__(product_id)
 
     def __repr__(self):
-        return 'Sentinel: {}'.format(self.__dict__)
+        return 'Sentinel: {}'.format(self.fields())
 
     # SR based products are not available for those
     # dates where we are missing auxiliary data
     def sr_date_restricted(self):
-        if self.sensor_name in restricted:
-            if 'by_date' in restricted[self.sensor_name].keys():
-                if not julian_date_check(self.julian, restricted[self.sensor_name]['by_date']['sr']):
-                    return True
-        return False
+        restriction = restrictions.index().date_restriction(self.sensor_name, 'sr')
+        return restriction is not None and not restriction.allows(self.julian)
 
 
 class SensorCONST(object):
@@ -732,6 +869,23 @@ class SensorCONST(object):
                     Viirs09GA, 'vnp09ga.A2019059.h18v06.001.2019061005706')
     }
 
+    # leading characters of a (lowercase) product id: shortname
+    # MODIS and VIIRS ids start with their shortname
+    prefixes = dict({'lt04': 'tm4_collection',
+                     'lt05': 'tm5_collection',
+                     'le07': 'etm7_collection',
+                     'lc08': 'olitirs8_collection',
+                     'lo08': 'oli8_collection',
+                     'l1c': 'sentinel',
+                     's2a': 'sentinel',
+                     's2b': 'sentinel'},
+                    **{k: k for k in instances if k.startswith(('mod', 'myd', 'vnp'))})
+
+    prefix_lengths = sorted({len(k) for k in prefixes}, reverse=True)
+
+    # shortname: (compiled regex, class object)
+    compiled = {k: (re.compile(v[0]), v[1]) for k, v in instances.items()}
+
 
 def instance(product_id):
     """
@@ -785,13 +939,27 @@ def instance(product_id):
         product_id = product_id[0:index]
         _id = _id[0:index]
 
-    instances = SensorCONST.instances
+    return _parse(product_id, _id)
+
 
-    for key in instances.keys():
-        if re.match(instances[key][0], _id):
-            inst = instances[key][1](product_id.strip())
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse(product_id, _id):
+    """
+    Build the (read-only) product for a product id, which has already
+    had its file extension removed, and a lowercase copy of it
+    """
+    for length in SensorCONST.prefix_lengths:
+        key = SensorCONST.prefixes.get(_id[:length])
+        if key is None:
+            continue
+
+        pattern, cls = SensorCONST.compiled[key]
+        if pattern.match(_id):
+            inst = cls(product_id.strip())
             inst.shortname = key
+            inst.freeze()
             return inst
+        break
 
     msg = u"[{0:s}] is not a supported sensor product".format(product_id)
     raise ProductNotImplemented(msg)
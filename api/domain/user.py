@@ -22,17 +22,51 @@ class UserException(Exception):
 
 class User(object):
 
-    base_sql = "SELECT username, email, first_name, last_name, contactid "\
+    base_sql = "SELECT id, username, email, first_name, last_name, contactid, "\
+                "is_staff, is_active, is_superuser "\
                 "FROM auth_user WHERE "
 
+    role_cols = ('is_staff', 'is_active', 'is_superuser')
+
     def __init__(self, username, email, first_name, last_name, contactid):
+        """
+        Register the user, or refresh their details if they already exist.
+        Only meant for the login and EE order loading paths, use the
+        query methods (where, find, by_username, ...) to read users
+
+        :param username: ERS username
+        :param email: contact email
+        :param first_name: first name
+        :param last_name: last name
+        :param contactid: ERS contact id
+        """
         self.username = username
         self.email = email
         self.first_name = first_name
         self.last_name = last_name
         self.contactid = contactid
+        self._roles = None
         self.id = self.find_or_create_user()
 
+    @classmethod
+    def from_row(cls, row):
+        """
+        Build a User from an existing auth_user row, without writing
+        anything back to the database
+
+        :param row: result row containing the base_sql columns
+        :return: User
+        """
+        user = cls.__new__(cls)
+        user.username = row['username']
+        user.email = row['email']
+        user.first_name = row['first_name']
+        user.last_name = row['last_name']
+        user.contactid = row['contactid']
+        user.id = row['id']
+        user._roles = {r: row[r] for r in cls.role_cols}
+        return user
+
     @property
     def username(self):
         return self._username
@@ -125,8 +159,8 @@ class User(object):
                       "(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s) " \
                       "on conflict (username) " \
                       "do update set (email, contactid, last_login) = (%s, %s, %s) " \
-                      "where auth_user.username = %s" \
-                      "returning id"
+                      "where auth_user.username = %s " \
+                      "returning id, is_staff, is_active, is_superuser"
         arg_tup = (username, email, first_name, last_name,
                    'pass', 'f', 't', 'f', nownow, nownow, contactid,
                    email, contactid, nownow, username)
@@ -136,6 +170,7 @@ class User(object):
                 db.execute(insert_stmt, arg_tup)
                 db.commit()
                 user_id = db.fetcharr[0]['id']
+                self._roles = {r: db.fetcharr[0][r] for r in self.role_cols}
             except:
                 exc_type, exc_val, exc_trace = sys.exc_info()
                 logger.critical("ERR user find_or_create args {0} {1} " \
@@ -166,9 +201,7 @@ class User(object):
                 logger.info('user.py where sql: {}'.format(log_sql))
                 db.select(sql, values)
                 for i in db:
-                    obj = User(i["username"], i["email"], i["first_name"],
-                               i["last_name"], i["contactid"])
-                    ret.append(obj)
+                    ret.append(User.from_row(i))
         except DBConnectException as e:
                 num, message = e.args
                 logger.critical('Error querying for users: {}\n'
@@ -213,9 +246,7 @@ class User(object):
 
         if db:
             for i in db:
-                obj = User(i["username"], i["email"], i["first_name"],
-                               i["last_name"], i["contactid"])
-                resp.append(obj)
+                resp.append(User.from_row(i))
 
         if _single:
             return resp[0]
@@ -223,7 +254,11 @@ class User(object):
             return resp
 
     def update(self, att, val):
-        self.__setattr__(att, val)
+        if att in self.role_cols:
+            if self._roles is not None:
+                self._roles[att] = val
+        else:
+            self.__setattr__(att, val)
         if isinstance(val, str) or isinstance(val, datetime.datetime):
             val = "\'{0}\'".format(val)
         sql = "update auth_user set {0} = {1} where id = {2};".format(att, val, self.id)
@@ -233,17 +268,25 @@ class User(object):
         return True
 
     def roles(self):
-        result = None
+        """
+        Role flags for the user, loaded along with the user row
+        and only queried for if they were not
+
+        :return: dict of is_staff, is_active, is_superuser
+        """
+        if self._roles is not None:
+            return self._roles
+
         with db_instance() as db:
             db.select("select is_staff, is_active, is_superuser from auth_user where id = %s;" % self.id)
         try:
-            result = db[0]
+            self._roles = dict(db[0])
         except:
             exc_type, exc_val, exc_trace = sys.exc_info()
             logger.critical("ERR retrieving roles for user. msg{0} trace{1}".format(exc_val, traceback.format_exc()))
             six.reraise(exc_type, exc_val, exc_trace)
 
-        return result
+        return self._roles
 
     def is_staff(self):
         return self.roles()['is_staff']
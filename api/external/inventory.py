@@ -2,18 +2,43 @@
 Replaced lta.py
 """
 import json
+import os
 import traceback
 import socket
 import re
-from itertools import groupby
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from api.domain import sensor
+from api.domain.catalog import EntityCatalog
 from api.providers.configuration.configuration_provider import ConfigurationProvider
 from api.providers.caching.caching_provider import CachingProvider
 from api.system.logger import ilogger as logger
 
 config = ConfigurationProvider()
+catalog = EntityCatalog()
+
+# HTTP connection handling for the M2M API, shared by every LTAService
+# created in the same process
+POOL_MAXSIZE = 16
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5
+CONNECT_TIMEOUT = 10  # seconds
+READ_TIMEOUT = 300  # seconds, download/stage requests can be slow
+SETTINGS_TTL = 300  # seconds before the M2M configuration is re-read
+
+# Large requests are split into chunks of at most CHUNK_SIZE ids, which
+# are sent to M2M concurrently on up to MAX_WORKERS threads
+CHUNK_SIZE = 200
+MAX_WORKERS = 8
+
+# Read timeout for each order status poll, so one slow order can not
+# hold up the rest
+ORDER_STATUS_TIMEOUT = 60  # seconds
 
 
 # -----------------------------------------------------------------------------+
@@ -29,30 +54,137 @@ def split_by_dataset(product_ids):
     :type product_ids: list
     :return: dict
     """
-    return {k: list(g) for k, g in groupby(sorted(product_ids),
-                                           lambda x: sensor.instance(x).lta_json_name)}
+    datasets = dict()
+    for product_id in product_ids:
+        datasets.setdefault(sensor.instance(product_id).lta_json_name, []).append(product_id)
+    return datasets
 
 
 class LTAError(Exception):
     pass
 
 
-class LTAService(object):
-    def __init__(self, token=None, current_user=None, ipaddr=None):
+def _retry_policy():
+    """
+    Retry connection failures for every call, M2M calls are safe to
+    repeat when the request never reached the application.  Gateway
+    errors are only retried for read-only methods, since a POST may
+    already have been acted on
+    """
+    kwargs = dict(total=MAX_RETRIES, connect=MAX_RETRIES, read=0,
+                  status=MAX_RETRIES, status_forcelist=(502, 503, 504),
+                  backoff_factor=BACKOFF_FACTOR, raise_on_status=False)
+    # only limits read and status retries, connect errors are retried for any method
+    methods = frozenset(['GET', 'HEAD'])
+    try:
+        return Retry(allowed_methods=methods, **kwargs)
+    except TypeError:
+        # urllib3 < 1.26
+        return Retry(method_whitelist=methods, **kwargs)
+
+
+class LTAConnection(object):
+    """
+    Per-process HTTP session and resolved settings for the M2M API
+
+    Holds a keep-alive requests.Session so repeated calls reuse the same
+    TLS connections, and caches the configuration and host IP which would
+    otherwise be looked up every time an LTAService is created
+    """
+    def __init__(self):
+        self.pid = os.getpid()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_MAXSIZE,
+                              pool_maxsize=POOL_MAXSIZE,
+                              max_retries=_retry_policy())
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+        self.ipaddr = None
+        self._settings = None
+        self._settings_time = 0
+        self._lock = threading.Lock()
+
+    def settings(self):
+        """
+        M2M credentials, endpoints and datapool rewrites, re-read from
+        the configuration every SETTINGS_TTL seconds
+
+        :return: dict
+        """
+        if self._settings is None or time.time() - self._settings_time > SETTINGS_TTL:
+            with self._lock:
+                if self._settings is None or time.time() - self._settings_time > SETTINGS_TTL:
+                    self._settings = self._load_settings()
+                    self._settings_time = time.time()
+        return self._settings
+
+    @staticmethod
+    def _load_settings():
         mode = config.mode
-        self.api_version = config.get('bulk.{0}.json.version'.format(mode))
-        self.agent = config.get('bulk.{0}.json.username'.format(mode))
-        self.agent_wurd = config.get('bulk.{0}.json.password'.format(mode))
-        self.base_url = config.url_for('earthexplorer.json')
+        version, agent, agent_wurd = config.get(
+            ['bulk.{0}.json.version'.format(mode),
+             'bulk.{0}.json.username'.format(mode),
+             'bulk.{0}.json.password'.format(mode)])
+        return {'api_version': version,
+                'agent': agent,
+                'agent_wurd': agent_wurd,
+                'base_url': config.url_for('earthexplorer.json'),
+                'external_landsat_regex': re.compile(config.url_for('landsat.external')),
+                'landsat_datapool': config.url_for('landsat.datapool'),
+                'external_modis_regex': re.compile(config.url_for('modis.external')),
+                'modis_datapool': config.url_for('modis.datapool')}
+
+    def host_ip(self):
+        if self.ipaddr is None:
+            self.ipaddr = socket.gethostbyaddr(socket.gethostname())[2][0]
+        return self.ipaddr
+
+    def request(self, verb, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return getattr(self.session, verb)(url, **kwargs)
+
+
+_connection = None
+_connection_lock = threading.Lock()
+
+
+def connection():
+    """
+    Retrieve the M2M connection for the current process, a forked
+    uwsgi worker builds its own rather than sharing the parent's sockets
+
+    :return: LTAConnection
+    """
+    global _connection
+    conn = _connection
+    if conn is None or conn.pid != os.getpid():
+        with _connection_lock:
+            conn = _connection
+            if conn is None or conn.pid != os.getpid():
+                conn = LTAConnection()
+                _connection = conn
+    return conn
+
+
+class LTAService(object):
+    def __init__(self, token=None, current_user=None, ipaddr=None, timeout=None):
+        self.connection = connection()
+        self.timeout = timeout
+        settings = self.connection.settings()
+        self.api_version = settings['api_version']
+        self.agent = settings['agent']
+        self.agent_wurd = settings['agent_wurd']
+        self.base_url = settings['base_url']
         self.current_user = current_user  # CONTACT ID
         self.token = token
-        self.ipaddr = ipaddr or socket.gethostbyaddr(socket.gethostname())[2][0]
+        self.ipaddr = ipaddr or self.connection.host_ip()
 
-        self.external_landsat_regex = re.compile(config.url_for('landsat.external'))
-        self.landsat_datapool = config.url_for('landsat.datapool')
+        self.external_landsat_regex = settings['external_landsat_regex']
+        self.landsat_datapool = settings['landsat_datapool']
 
-        self.external_modis_regex = re.compile(config.url_for('modis.external'))
-        self.modis_datapool = config.url_for('modis.datapool')
+        self.external_modis_regex = settings['external_modis_regex']
+        self.modis_datapool = settings['modis_datapool']
 
         if self.current_user and self.token:
             self.set_user_context(self.current_user, ipaddress=self.ipaddr)
@@ -121,7 +253,10 @@ class LTAService(object):
         if 'password' not in str(data).lower():
             logger.debug('Payload: {}'.format(data))
         # Note: using `data=` (to force form-encoded params)
-        response = getattr(requests, verb)(url, data=data)
+        kwargs = dict(data=data)
+        if self.timeout is not None:
+            kwargs['timeout'] = (CONNECT_TIMEOUT, self.timeout)
+        response = self.connection.request(verb, url, **kwargs)
         logger.debug('[RESPONSE] %s\n%s', response, response.content)
         return self._parse(response)
 
@@ -152,7 +287,7 @@ class LTAService(object):
         """
         url = f"{self.base_url}login"
         logger.debug('HEAD {}'.format(url))
-        resp = requests.head(url)
+        resp = self.connection.request('head', url)
         return resp.ok
 
     def logout(self):
@@ -173,50 +308,51 @@ class LTAService(object):
         """
         Convert Collection IDs (LC08_...) into M2M entity IDs
 
+        Mappings already in the entity catalog are not sent to M2M
+
         :param product_ids: Landsat Collection IDs ['LC08_..', ...]
         :type product_ids: list
         :param dataset: The dataset name
         :type dataset: str
         :return: dict
         """
-        endpoint = 'idLookup'
         id_list = [i for i in product_ids]
+        results = catalog.lookup(dataset, id_list)
+        missing = [i for i in id_list if i not in results]
+        if missing:
+            resolved = self._id_lookup(missing, dataset)
+            catalog.store(dataset, resolved)
+            results.update(resolved)
+
+        return {k: results.get(k) for k in id_list}
+
+    def _id_lookup(self, product_ids, dataset):
+        """
+        Ask M2M for the entity IDs, keyed on the original Collection IDs
+
+        :return: dict
+        """
+        endpoint = 'idLookup'
+        # M2M display ID -> Collection ID
+        display_ids = {i: i for i in product_ids}
         if dataset.startswith('MODIS'):
             # WARNING: MODIS dataset does not have processed date
             #           in M2M entity lookup!
-            id_list = [i.rsplit('.', 1)[0] for i in id_list]
+            display_ids = {i.rsplit('.', 1)[0]: i for i in product_ids}
 
         # We need to include the .h5 file extension when verifying viirs scene IDs
         if dataset.startswith('VIIRS'):
             viirs_ext = '.h5'
-            id_list = [i + viirs_ext for i in id_list if not i.endswith(viirs_ext)]
+            display_ids = {i + viirs_ext: i for i in product_ids if not i.endswith(viirs_ext)}
 
         payload = dict(apiKey=self.token,
-                       idList=id_list,
+                       idList=list(display_ids),
                        inputField='displayId', datasetName=dataset)
         resp = self._post(endpoint, payload)
-        results = resp.get('data')
-
-        id_list = [i for i in product_ids]
-        if dataset.startswith('MODIS') and results:
-            # WARNING: See above. Need to "undo" the MODIS mapping problem.
-            modis_results = dict()
-            for k, v in results.items():
-                _key = [i for i in id_list if k in i].pop()
-                modis_results[_key] = v
-            results = modis_results
-            modis_results = None
-
-        if dataset.startswith('VIIRS') and results:
-            # Undo the file extension addition from above
-            viirs_results = dict()
-            for k, v in results.items():
-                _key = [i for i in id_list if i in k].pop()
-                viirs_results[_key] = v
-            results = viirs_results
-            viirs_results = None
+        results = resp.get('data') or dict()
 
-        return {k: results.get(k) for k in id_list}
+        # "Undo" the MODIS and VIIRS display ID mapping from above
+        return {display_ids.get(k, k): v for k, v in results.items()}
 
     def download_options(self, entity_ids, dataset):
         """ 
@@ -343,7 +479,8 @@ class LTAService(object):
         #                     'statusText', 'unitNumber'
         return result
 
-    def update_order_status(self, order_number, unit_number, status):
+    def update_order_status(self, order_number, unit_number, status,
+                            last_unit_number=None):
         """
         Update the status of orders ESPA is working on.
 
@@ -353,10 +490,15 @@ class LTAService(object):
         :type  unit_number:  string
         :param status:       the EE defined status value
         :type  status:       string
+        :param last_unit_number: update every unit from unit_number
+                                 through this one (inclusive)
+        :type  last_unit_number: string
         """
         endpoint = 'setunitstatus'
+        if last_unit_number is None:
+            last_unit_number = unit_number
         payload = dict(apiKey=self.token, orderNumber=order_number, unitStatus=status,
-                       firstUnitNumber=unit_number, lastUnitNumber=unit_number)
+                       firstUnitNumber=unit_number, lastUnitNumber=last_unit_number)
         response = self._post(endpoint, payload)
         error = response.get('error')
 
@@ -366,7 +508,7 @@ class LTAService(object):
             # throw exception if non 200 response?
             msg = "Problem updating order status in EE.\n" \
                   f"order_number: {order_number}\n" \
-                  f"unit_umber: {unit_number}\n" \
+                  f"unit_umber: {unit_number}-{last_unit_number}\n" \
                   f"status: {status}\n" \
                   f"response: {response}\n"
             logger.error(msg)
@@ -514,9 +656,58 @@ def available():
     return LTAService().available()
 
 
+def chunk_by_dataset(product_ids, chunk_size=None):
+    """
+    Split IDs into (dataset, ids) work items of at most chunk_size IDs
+
+    :param product_ids: Collection IDs ['LC08_..', ...]
+    :type product_ids: list
+    :return: list of tuples
+    """
+    chunk_size = chunk_size or CHUNK_SIZE
+    return [(dataset, ids[i:i + chunk_size])
+            for dataset, ids in split_by_dataset(product_ids).items()
+            for i in range(0, len(ids), chunk_size)]
+
+
+def map_chunks(func, token, product_ids, chunk_size=None, max_workers=None):
+    """
+    Call func(token, ids, dataset) for every chunk of the product IDs,
+    running the chunks concurrently on a bounded pool of threads
+
+    A chunk which fails does not stop the others, its exception is
+    returned in place of the result
+
+    :param func: callable taking (token, ids, dataset)
+    :param token: M2M API key
+    :param product_ids: Collection IDs ['LC08_..', ...]
+    :type product_ids: list
+    :return: list of (dataset, ids, result, exception) tuples
+    """
+    chunks = chunk_by_dataset(product_ids, chunk_size)
+
+    def call(chunk):
+        dataset, ids = chunk
+        try:
+            return dataset, ids, func(token, ids, dataset), None
+        except Exception as e:
+            return dataset, ids, None, e
+
+    if len(chunks) < 2:
+        return [call(c) for c in chunks]
+
+    max_workers = min(max_workers or MAX_WORKERS, len(chunks))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(call, chunks))
+
+
 def check_valid(token, product_ids):
-    return dict(z for d, l in split_by_dataset(product_ids).items()
-                for z in verify_scenes(token, l, d).items())
+    results = dict()
+    for dataset, ids, verified, error in map_chunks(verify_scenes, token, product_ids):
+        if error is not None:
+            raise error
+        results.update(verified)
+    return results
 
 
 def clear_user_context(token):
@@ -533,6 +724,19 @@ def download_urls(token, product_ids, dataset, usage='[espa]'):
     return {p: urls.get(e) for p, e in entities.items() if e in urls}
 
 
+def verified_download_urls(token, product_ids, dataset, usage='[espa]'):
+    """
+    Verify the IDs are still available, and fetch download URLs for
+    those that are
+
+    :return: tuple of ({product_id: bool}, {product_id: url})
+    """
+    verified = verify_scenes(token, product_ids, dataset)
+    available = [p for p, ok in verified.items() if ok]
+    urls = download_urls(token, available, dataset, usage=usage) if available else dict()
+    return verified, urls
+
+
 def get_available_orders(token, contactid=None):
     return LTAService(token).get_available_orders(contactid)
 
@@ -545,8 +749,38 @@ def get_download_urls(token, entity_ids, dataset, usage='[espa]'):
     return LTAService(token).get_download_urls(entity_ids, dataset, usage=usage)
 
 
-def get_order_status(token, order_number):
-    return LTAService(token).get_order_status(order_number)
+def get_order_status(token, order_number, timeout=None):
+    return LTAService(token, timeout=timeout).get_order_status(order_number)
+
+
+def get_order_statuses(token, order_numbers, timeout=None, max_workers=None):
+    """
+    Poll the status of several EE orders concurrently on a bounded pool
+    of threads, each call limited to timeout seconds
+
+    An order which can not be polled does not stop the others, its
+    exception is returned in place of the status
+
+    :param token: M2M API key
+    :param order_numbers: EE order ids
+    :type order_numbers: list
+    :return: dict {order_number: status dict or exception}
+    """
+    timeout = timeout or ORDER_STATUS_TIMEOUT
+
+    def call(order_number):
+        try:
+            return order_number, get_order_status(token, order_number, timeout=timeout)
+        except Exception as e:
+            return order_number, e
+
+    order_numbers = list(order_numbers)
+    if len(order_numbers) < 2:
+        return dict(call(o) for o in order_numbers)
+
+    max_workers = min(max_workers or MAX_WORKERS, len(order_numbers))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return dict(pool.map(call, order_numbers))
 
 
 def get_session():
@@ -568,8 +802,9 @@ def logout(token):
     return LTAService(token).logout()
 
 
-def update_order_status(token, order_number, unit_number, status):
-    return LTAService(token).update_order_status(order_number, unit_number, status)
+def update_order_status(token, order_number, unit_number, status, last_unit_number=None):
+    return LTAService(token).update_order_status(order_number, unit_number, status,
+                                                 last_unit_number)
 
 
 def verify_scenes(token, product_ids, dataset):
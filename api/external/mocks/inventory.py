@@ -174,7 +174,7 @@ def check_valid_sentinel_false(token, prod_name_list):
 def get_user_name(token, contactid, ipaddr):
     return 'klmsith@usgs.gov'
 
-def get_order_status(token, tramid):
+def get_order_status(token, tramid, timeout=None):
     response = None
     if tramid == sample_tram_order_ids()[0]:
         response = {'units': [{'orderingId':sample_scene_names()[0], 'statusCode': 'R'}]}
@@ -186,11 +186,11 @@ def get_order_status(token, tramid):
         response = {'units': [{'orderingId': sample_scene_names()[0], 'statusCode': 'C'}]}
     return response
 
-def update_order_status(token, ee_order_id, ee_unit_id, something):
+def update_order_status(token, ee_order_id, ee_unit_id, something, last_unit_id=None):
     return True, True, True
 
 
-def update_order_status_fail(token, ee_order_id, ee_unit_id, something):
+def update_order_status_fail(token, ee_order_id, ee_unit_id, something, last_unit_id=None):
     raise Exception('lta comms failed')
 
 def sample_tram_order_ids():
@@ -27,3 +27,16 @@ def mock_exists(orderid):
 
 def mock_delete(orderid):
     return True
+
+
+def mock_delete_many(orderids):
+    return {o: 'deleted' for o in orderids}
+
+
+def mock_list_orders():
+    return ('file1', 'file2')
+
+
+def delete_many(self, cmd):
+    orderids = [part.split(';')[0] for part in cmd.split('echo deleted ')[1:]]
+    return {'stdout': ['deleted {}\n'.format(o) for o in orderids]}
@@ -2,12 +2,23 @@
 cache '''
 
 import os
+import shlex
+import shutil
+import stat
+from concurrent.futures import ThreadPoolExecutor
 
 from api.providers.configuration.configuration_provider import ConfigurationProvider
 from api.util import sshcmd
 from api.system.logger import ilogger as logger
 
 
+# Orders removed by each remote command in OnlineCache.delete_many
+DELETE_BATCH_SIZE = 100
+
+# Threads removing orders in LocalOnlineCache.delete_many
+DELETE_WORKERS = 4
+
+
 class OnlineCacheException(Exception):
     """ General exception raised from the OnlineCache """
     pass
@@ -35,10 +46,12 @@ class OnlineCache(object):
                                           self.__user_key,
                                           self.__pw_key])
 
-        self.client = sshcmd.RemoteHost(host, user, pw, timeout=5)
+        # the connection is shared by every OnlineCache in this process,
+        # and only opened here if it is not already up
+        self.client = sshcmd.get_host(host, user, pw, timeout=5)
 
         try:
-            self.client.execute('ls')
+            self.client.connect()
         except Exception as e:
             logger.critical('No connection to OnlineCache host: {}'.format(e))
             raise OnlineCacheException(e)
@@ -93,6 +106,61 @@ class OnlineCache(object):
             return False
         return True
 
+    def delete_many(self, orderids, batch_size=None):
+        """
+        Removes several orders from the online cache disk, checking for
+        and deleting up to batch_size orders with each remote command
+
+        :param orderids: associated orders to delete
+        :param batch_size: orders per remote command
+        :return: dict of {orderid: 'deleted', 'missing' or 'failed'}
+        """
+        batch_size = batch_size or DELETE_BATCH_SIZE
+        results = dict()
+
+        valid = list()
+        for orderid in sorted(set(orderids)):
+            if not orderid or '/' in orderid or orderid in ('.', '..'):
+                logger.critical('Invalid orderid {}'.format(orderid))
+                results[orderid] = 'failed'
+            else:
+                valid.append(orderid)
+        orderids = valid
+
+        for i in range(0, len(orderids), batch_size):
+            batch = orderids[i:i + batch_size]
+            cmd = ';'.join(self._delete_script(orderid) for orderid in batch)
+            logger.info('Deleting {} orders from online cache'.format(len(batch)))
+            try:
+                result = self.execute_command(cmd)
+            except OnlineCacheException as exc:
+                logger.critical('Failed to remove files from output cache. '
+                                'Orders: {} Error: {}'.format(batch, exc))
+                results.update(dict.fromkeys(batch, 'failed'))
+                continue
+
+            reported = dict()
+            for line in result['stdout']:
+                status, _, orderid = line.strip().partition(' ')
+                if orderid in batch:
+                    reported[orderid] = status
+            # anything the command never reported on did not finish
+            results.update({o: reported.get(o, 'failed') for o in batch})
+
+        return results
+
+    def _delete_script(self, orderid):
+        """
+        Shell snippet which removes one order directory, and reports
+        back on stdout how it went (errors are kept off stderr so one
+        order can not fail the whole batch)
+        """
+        path = shlex.quote(os.path.join(self.orderpath, orderid))
+        name = shlex.quote(orderid)
+        return ('if [ -e {0} ]; then chmod -R 744 {0} 2>/dev/null; rm -rf {0} 2>/dev/null; '
+                'if [ -e {0} ]; then echo failed {1}; else echo deleted {1}; fi; '
+                'else echo missing {1}; fi').format(path, name)
+
     def list(self, orderid=None):
         """
         List the orders currently stored on cache, or files listed
@@ -161,13 +229,207 @@ class OnlineCache(object):
 
         return result
 
+
+class LocalOnlineCache(OnlineCache):
+    """
+    Online cache client for hosts which have the orders directory
+    mounted, works on the filesystem directly instead of over SSH
+    """
+
+    def __init__(self):
+        self.orderpath = self.config.get('online_cache_orders_dir')
+
+        if not self.orderpath:
+            msg = 'online_cache_orders_dir not defined in configurations'
+            logger.critical(msg)
+            raise OnlineCacheException(msg)
+
+        if not os.path.isdir(self.orderpath):
+            msg = 'OnlineCache orders directory {} is not mounted'.format(self.orderpath)
+            logger.critical(msg)
+            raise OnlineCacheException(msg)
+
+        self.client = None
+
+    def exists(self, orderid, filename=None):
+        """ Check if an order [optional filename] exists on the onlinecache
+
+        :param orderid:  associated order to check
+        :param filename: file to check inside of an order
+        :return: bool
+        """
+        if filename:
+            path = os.path.join(self.orderpath, orderid, filename)
+        else:
+            path = os.path.join(self.orderpath, orderid)
+
+        return os.path.exists(path)
+
+    def delete(self, orderid, filename=None):
+        """
+        Removes an order from physical online cache disk
+
+        :param filename: file to delete inside of an order
+        :param orderid: associated order to delete
+        """
+        if not self.exists(orderid, filename):
+            msg = 'Invalid orderid {} or filename {}'.format(orderid, filename)
+            logger.critical(msg)
+            return False
+
+        if filename:
+            path = os.path.join(self.orderpath, orderid, filename)
+        else:
+            path = os.path.join(self.orderpath, orderid)
+
+        logger.info('Deleting {} from online cache'.format(path))
+        try:
+            self._remove(path)
+        except OSError as exc:
+            logger.critical('Failed to remove files from output cache. '
+                            'Path: {} Error: {}'.format(path, exc))
+            return False
+        return True
+
+    def delete_many(self, orderids, batch_size=None):
+        """
+        Removes several orders from the online cache disk, on a pool of
+        DELETE_WORKERS threads
+
+        :param orderids: associated orders to delete
+        :param batch_size: unused, kept for compatibility with OnlineCache
+        :return: dict of {orderid: 'deleted', 'missing' or 'failed'}
+        """
+        def remove(orderid):
+            if not orderid or '/' in orderid or orderid in ('.', '..'):
+                logger.critical('Invalid orderid {}'.format(orderid))
+                return orderid, 'failed'
+
+            path = os.path.join(self.orderpath, orderid)
+            if not os.path.lexists(path):
+                return orderid, 'missing'
+            try:
+                self._remove(path)
+            except OSError as exc:
+                logger.critical('Failed to remove files from output cache. '
+                                'Path: {} Error: {}'.format(path, exc))
+                return orderid, 'failed'
+            return orderid, 'deleted'
+
+        orderids = sorted(set(orderids))
+        if not orderids:
+            return dict()
+
+        logger.info('Deleting {} orders from online cache'.format(len(orderids)))
+        with ThreadPoolExecutor(max_workers=min(DELETE_WORKERS, len(orderids))) as pool:
+            return dict(pool.map(remove, orderids))
+
+    @staticmethod
+    def _remove(path):
+        """ Remove a file or directory tree, fixing up read-only entries """
+        def make_writable(func, target, exc_info):
+            parent = os.path.dirname(target)
+            os.chmod(parent, os.stat(parent).st_mode | stat.S_IRWXU)
+            if os.path.lexists(target) and not os.path.islink(target):
+                os.chmod(target, os.stat(target).st_mode | stat.S_IRWXU)
+            func(target)
+
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path, onerror=make_writable)
+        else:
+            os.remove(path)
+
+    def list(self, orderid=None):
+        """
+        List the orders currently stored on cache, or files listed
+        insed of a specific order
+
+        :param orderid: order name to look inside of
+        :return: list of folders/files
+        """
+        if orderid:
+            path = os.path.join(self.orderpath, orderid)
+        else:
+            path = self.orderpath
+
+        try:
+            with os.scandir(path) as entries:
+                return tuple(sorted(e.name for e in entries))
+        except OSError as exc:
+            logger.critical('Error listing {}: {}'.format(path, exc))
+            raise OnlineCacheException(exc)
+
+    def capacity(self):
+        """
+        Returns the capacity of the online cache, formatted like df -h
+
+        :return: dict
+        """
+        try:
+            st = os.statvfs(self.orderpath)
+        except OSError as exc:
+            logger.critical('Error reading capacity of {}: {}'.format(self.orderpath, exc))
+            raise OnlineCacheException(exc)
+
+        total = st.f_blocks * st.f_frsize
+        available = st.f_bavail * st.f_frsize
+        used = (st.f_blocks - st.f_bfree) * st.f_frsize
+        # df rounds up, and leaves the root reserved blocks out of the percentage
+        usable = used + available
+        percent = -(-used * 100 // usable) if usable else 0
+
+        return {'capacity': human_size(total),
+                'used': human_size(used),
+                'available': human_size(available),
+                'percent_used': '{}%'.format(percent)}
+
+
+def human_size(num):
+    """
+    Format a byte count the way df -h does (1K = 1024)
+
+    :param num: size in bytes
+    :return: str
+    """
+    for unit in ('', 'K', 'M', 'G', 'T', 'P'):
+        if num < 1024 or unit == 'P':
+            break
+        num /= 1024.0
+    if not unit:
+        return '{}'.format(int(num))
+    if num < 10:
+        return '{:.1f}{}'.format(num, unit)
+    return '{:.0f}{}'.format(num, unit)
+
+
+def cache():
+    """
+    Online cache client chosen by the online_cache_backend configuration,
+    'local' when the orders directory is mounted on this host, otherwise
+    commands are run over SSH
+
+    :return: OnlineCache
+    """
+    if OnlineCache.config.get('online_cache_backend') == 'local':
+        return LocalOnlineCache()
+    return OnlineCache()
+
+
 def exists(orderid):
-    return OnlineCache().exists(orderid)
+    return cache().exists(orderid)
 
 
 def delete(orderid, filename=None):
-    return OnlineCache().delete(orderid, filename)
+    return cache().delete(orderid, filename)
+
+
+def delete_many(orderids):
+    return cache().delete_many(orderids)
+
+
+def list_orders():
+    return cache().list()
 
 
 def capacity():
-    return OnlineCache().capacity()
+    return cache().capacity()
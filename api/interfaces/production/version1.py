@@ -83,6 +83,26 @@ class API(object):
 
         return response
 
+    def update_products(self, params):
+        """Apply a batch of product updates in a single transaction
+
+        Args:
+            params (list): of dicts, each holding an action key (update_status,
+                            set_product_error, set_product_unavailable,
+                            mark_product_complete) along with the name, orderid
+                            and args accepted by update_product_details for it
+
+        Returns:
+            list: result for each update, in the order received
+        """
+        try:
+            response = self.production.update_products(params)
+        except:
+            logger.critical("ERR version1 update_products, params: {0}\ntrace: {1}\n".format(params, traceback.format_exc()))
+            response = default_error_message
+
+        return response
+
     def handle_orders(self, params):
         """Handler for accepting orders and products into the processing system
 
@@ -2,7 +2,7 @@
 from api.providers.administration import AdminProviderInterfaceV0
 from api.providers.administration import AdministrationProviderException
 from api.providers.configuration.configuration_provider import ConfigurationProvider
-from api.external.onlinecache import OnlineCache
+from api.external import onlinecache
 from api.system.logger import ilogger as logger
 from api.util.dbconnect import db_instance
 from api.util.dbconnect import DBConnectException
@@ -44,15 +44,15 @@ class AdministrationProvider(AdminProviderInterfaceV0):
 
     def onlinecache(self, list_orders=False, orderid=None, filename=None, delete=False):
         if delete and orderid and filename:
-            return OnlineCache().delete(orderid, filename)
+            return onlinecache.cache().delete(orderid, filename)
         elif delete and orderid:
-            return OnlineCache().delete(orderid)
+            return onlinecache.cache().delete(orderid)
         elif list_orders:
-            return OnlineCache().list()
+            return onlinecache.cache().list()
         elif orderid:
-            return OnlineCache().list(orderid)
+            return onlinecache.cache().list(orderid)
         else:
-            return OnlineCache().capacity()
+            return onlinecache.cache().capacity()
 
     @staticmethod
     def error_to(orderid, state):
@@ -115,6 +115,7 @@ class AdministrationProvider(AdminProviderInterfaceV0):
             num, message = e.args
             logger.critical("error updating system status: {}".format(e))
             return {'msg': "error updating database: {}".format(message)}
+        ConfigurationProvider.invalidate()
 
         return True
 
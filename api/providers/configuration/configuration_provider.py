@@ -1,11 +1,22 @@
 import os
 import datetime
+import threading
+import time
 import yaml
 
-from api.util.dbconnect import db_instance
+from api.util.dbconnect import db_instance, is_test_mode
 from api.providers.configuration import ConfigurationProviderInterfaceV0
 from api.util import api_cfg
 
+# Seconds a configuration snapshot is used before checking the
+# database for changes made by other processes
+CONFIG_TTL = 30
+
+# Snapshots of ordering_configuration, keyed on whether the
+# unit test schema is in use
+_snapshots = {}
+_snapshot_lock = threading.Lock()
+
 
 class ConfigurationProviderException(Exception):
     pass
@@ -37,12 +48,12 @@ class ConfigurationProvider(ConfigurationProviderInterfaceV0):
 
     def url_for(self, service_name):
         key = "url.{0}.{1}".format(self.mode, service_name)
-        current = self.retrieve_config()
+        current = self.snapshot()
 
         return current.get(key)
 
     def get(self, key):
-        current = self.retrieve_config()
+        current = self.snapshot()
 
         if isinstance(key, (list, tuple)):
             ret = [current.get(k) for k in key]
@@ -72,6 +83,7 @@ class ConfigurationProvider(ConfigurationProviderInterfaceV0):
         with db_instance() as db:
             db.execute(query, (key, value, value))
             db.commit()
+        self.invalidate()
 
         return {key: self.get(key)}
 
@@ -84,11 +96,12 @@ class ConfigurationProvider(ConfigurationProviderInterfaceV0):
             with db_instance() as db:
                 db.execute(query, (key,))
                 db.commit()
+            self.invalidate()
 
         return self.get(key)
 
     def exists(self, key):
-        current = self.retrieve_config()
+        current = self.snapshot()
 
         if key in current:
             return True
@@ -111,6 +124,7 @@ class ConfigurationProvider(ConfigurationProviderInterfaceV0):
         with db_instance() as db:
             db.execute(sql)
             db.commit()
+        self.invalidate()
 
     def dump(self, path=None):
         ts = datetime.datetime.now().strftime('config-%m%d%y-%H%M%S')
@@ -170,10 +184,70 @@ class ConfigurationProvider(ConfigurationProviderInterfaceV0):
 
     @staticmethod
     def retrieve_config():
+        return dict(ConfigurationProvider.snapshot())
+
+    @staticmethod
+    def snapshot():
+        """
+        Current configuration, shared by every provider in the process
+
+        Reloaded after CONFIG_TTL seconds, but only if the version
+        counter (bumped by a trigger on ordering_configuration) shows
+        that another process has changed something
+
+        :return: dict, which must not be modified
+        """
+        mode = is_test_mode()
+        now = time.time()
+        snap = _snapshots.get(mode)
+
+        if snap and now - snap['checked'] < CONFIG_TTL:
+            return snap['config']
+
+        if snap and snap['version'] is not None:
+            with db_instance() as db:
+                db.select('select version from ordering_configuration_version')
+                version = db[0]['version'] if db else None
+
+            if version == snap['version']:
+                snap['checked'] = now
+                return snap['config']
+
+        config, version = ConfigurationProvider.load_snapshot()
+        with _snapshot_lock:
+            _snapshots[mode] = {'config': config, 'version': version,
+                                'checked': now}
+        return config
+
+    @staticmethod
+    def load_snapshot():
+        """
+        Read the full configuration along with its version, the version
+        is None if the database does not track one
+
+        :return: (dict, int)
+        """
         config = {}
+        version = None
         with db_instance() as db:
+            db.select("select to_regclass('ordering_configuration_version') "
+                      "is not null as tracked")
+            # read the version first, so a change committed in between
+            # is picked up on the next check
+            if db[0]['tracked']:
+                db.select('select version from ordering_configuration_version')
+                version = db[0]['version'] if db else None
+
             con_query = 'select key, value from ordering_configuration'
             db.select(con_query)
             for i in db:
                 config[i['key']] = i['value']
-        return config
+        return config, version
+
+    @staticmethod
+    def invalidate():
+        """
+        Drop the cached configuration, so the next read goes to the database
+        """
+        with _snapshot_lock:
+            _snapshots.clear()
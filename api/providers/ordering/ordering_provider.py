@@ -1,14 +1,10 @@
 import datetime
-import os
 import copy
-import yaml
-from api import __location__
-from api.domain import sensor
+from api.domain import sensor, restrictions
 from api.domain.order import Order
 from api.domain.scene import Scene
 from api.domain.user import User
 from api.util.dbconnect import db_instance
-from api.util import julian_date_check
 from api.providers.ordering import ProviderInterfaceV0
 from api import OpenSceneLimitException
 from api.providers.configuration.configuration_provider import ConfigurationProvider
@@ -46,16 +42,10 @@ class OrderingProvider(ProviderInterfaceV0):
         """
         user = User.by_username(username)
         pub_prods = copy.deepcopy(OrderingProvider.sensor_products(product_id))
-        with open(os.path.join(__location__, 'domain/restricted.yaml')) as f:
-            restricted = yaml.safe_load(f.read())
+        restricted = restrictions.index()
 
         role = False if user.is_staff() else True
 
-        restrict_all = restricted.get('all', {})
-        all_role = restrict_all.get('role', [])
-        all_by_date = restrict_all.get('by_date', {})
-        all_ordering_rsctd = restrict_all.get('ordering', [])
-
         upd = {'date_restricted': {}, 'ordering_restricted': {}, 'not_implemented': []}
         for sensor_type, prods in list(pub_prods.items()):
             if sensor_type == 'not_implemented':
@@ -63,12 +53,8 @@ class OrderingProvider(ProviderInterfaceV0):
 
             stype = sensor_type.replace('_collection', '') if '_collection' in sensor_type else sensor_type
 
-            sensor_restr = restricted.get(stype, {})
-            role_restr = sensor_restr.get('role', []) + all_role
-            by_date_restr = sensor_restr.get('by_date', {})
-
-            # All overrides any sensor related dates
-            by_date_restr.update(all_by_date)
+            role_restr = restricted.role(stype)
+            by_date_restr = restricted.by_date(stype)
 
             outs = pub_prods[sensor_type]['products']
             ins = pub_prods[sensor_type]['inputs']
@@ -90,7 +76,7 @@ class OrderingProvider(ProviderInterfaceV0):
                 pub_prods.pop(sensor_type)
                 continue
 
-            if sensor_type in all_ordering_rsctd:
+            if sensor_type in restricted.ordering:
                 for sc_id in ins:
                     if sensor_type in upd['ordering_restricted']:
                         upd['ordering_restricted'][sensor_type].append(sc_id)
@@ -107,20 +93,18 @@ class OrderingProvider(ProviderInterfaceV0):
                     except ValueError:
                         continue
 
+            julians = None
             for prod in outs:
                 if prod in by_date_restr:
-                    r = sensor_restr['by_date'][prod]
-                    for sc_id in ins:
-                        obj = sensor.instance(sc_id)
-                        julian = '{}{}'.format(obj.year, obj.doy)
-
-                        if not julian_date_check(julian, r):
-                            remove_me.append(prod)
-
-                            if prod in upd['date_restricted']:
-                                upd['date_restricted'][prod].append(sc_id)
-                            else:
-                                upd['date_restricted'][prod] = [sc_id]
+                    if julians is None:
+                        julians = [int('{}{}'.format(obj.year, obj.doy))
+                                   for obj in map(sensor.instance, ins)]
+
+                    allowed = by_date_restr[prod].mask(julians)
+                    rejected = [sc_id for sc_id, ok in zip(ins, allowed) if not ok]
+                    if rejected:
+                        remove_me.append(prod)
+                        upd['date_restricted'].setdefault(prod, []).extend(rejected)
 
             for rem in remove_me:
                 try:
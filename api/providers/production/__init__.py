@@ -48,6 +48,11 @@ class ProductionProviderInterfaceV0(object, metaclass=abc.ABCMeta):
         set_product_unavailable, mark_product_complete """
         return
 
+    @abc.abstractmethod
+    def update_products(self, updates):
+        """ apply a batch of update_product actions in one transaction """
+        return
+
     @abc.abstractmethod
     def set_product_retry(self, name, orderid, processing_loc,
                           error, note, retry_after, retry_limit=None):
@@ -1,8 +1,8 @@
 from api.domain import sensor
 from api.domain.scene import Scene, SceneException
-from api.domain.order import Order, OptionsConversion, OrderException
+from api.domain.order import Order, OptionsConversion
 from api.providers.configuration.configuration_provider import ConfigurationProvider
-from api.util.dbconnect import DBConnectException, db_instance
+from api.util.dbconnect import DBConnectException, db_instance, unit_of_work
 from api.providers.production import ProductionProviderInterfaceV0
 from api.providers.caching.caching_provider import CachingProvider
 from api.external import inventory, onlinecache
@@ -71,6 +71,38 @@ class ProductionProvider(ProductionProviderInterfaceV0):
 
         return True
 
+    @staticmethod
+    def find_product(name, orderid):
+        """
+        Load a scene and its order columns with a single query
+
+        :param name: name of scene
+        :param orderid: order id of scene
+        :return: (Scene, dict of order columns)
+        """
+        scene, order = Scene.with_order(name, orderid)
+        if scene is None:
+            raise ProductionProviderException('product {} not found in order {}'
+                                              .format(name, orderid))
+        return scene, order
+
+    def save_product(self, scene, order, ee_status=None):
+        """
+        Send any EE status change for the scene, then save it
+
+        :param scene: Scene to save
+        :param order: dict of the scene's order columns
+        :param ee_status: EE unit status to send, if the order came from EE
+        """
+        if ee_status and order['order_source'] == 'ee':
+            self.update_ee_statuses([(scene, order['ee_order_id'], ee_status)])
+
+        try:
+            scene.save()
+        except SceneException as e:
+            msg = "Exception saving scene: {0}\nmessage: {1}".format(scene, e)
+            raise ProductionProviderException(msg)
+
     def mark_product_complete(self, name, orderid, processing_loc=None,
                               completed_file_location=None,
                               destination_cksum_file=None,
@@ -85,74 +117,13 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         :param log_file_contents: log file contents from processing
         :return: True
         """
-        order_status = Scene.get('ordering_order.status', name, orderid)
-
-        order_id = Scene.get('order_id', name, orderid)
-        order_source = Scene.get('order_source', name, orderid)
-        base_url = config.url_for('distribution.cache')
-
-        product_file = os.path.basename(completed_file_location)
-        cksum_file = os.path.basename(destination_cksum_file)
-
-        product_dload_url = ('{}/orders/{}/{}'
-                             .format(base_url, orderid, product_file))
-        cksum_download_url = ('{}/orders/{}/{}'
-                              .format(base_url, orderid, cksum_file))
-
-        scene = Scene.by_name_orderid(name, order_id)
-
-        if order_status == 'cancelled':
-            if os.path.exists(completed_file_location):
-                scene.download_size = os.path.getsize(completed_file_location)
-                onlinecache.delete(orderid, filename=product_file)
-                onlinecache.delete(orderid, filename=cksum_file)
-            else:
-                logger.warning(f"ERR file was not found: {completed_file_location}")
-            Scene.bulk_update([scene.id], Scene.cancel_opts())
-            return False
-
-        scene.status = 'complete'
-        scene.processing_location = processing_loc
-        scene.product_distro_location = completed_file_location
-        scene.completion_date = datetime.datetime.now()
-        scene.cksum_distro_location = destination_cksum_file
-        scene.log_file_contents = log_file_contents
-        scene.product_dload_url = product_dload_url
-        scene.cksum_download_url = cksum_download_url
-        try:
-            scene.download_size = os.path.getsize(completed_file_location)
-        except OSError:
-            # seeing occasional delays in file availability after processing notifies the api of completion
-            # raise ProductionProviderException('Could not find completed file location')
-            logger.info(
-                "mark_product_complete could not find completed file location {}, marking it zero for now...".format(
-                    completed_file_location))
-            scene.download_size = 0
-
-        if order_source == 'ee':
-            token = inventory.get_cached_session()
-            # update EE
-            ee_order_id = Scene.get('ee_order_id', name, orderid)
-            ee_unit_id = Scene.get('ee_unit_id', name, orderid)
-            try:
-                inventory.update_order_status(token, ee_order_id, ee_unit_id, 'C')
-            except Exception as e:
-                cache_key = 'lta.cannot.update'
-                lta_conn_failed_10mins = cache.get(cache_key)
-                if lta_conn_failed_10mins:
-                    logger.warn('Problem updating LTA order: {}'.format(e))
-                cache.set(cache_key, datetime.datetime.now())
-                scene.failed_lta_status_update = 'C'
-
-        try:
-            scene.save()
-        except DBConnectException as e:
-            num, message = e.args
-            message = "DBConnect Exception ordering_provider mark_product_complete scene: {0}" \
-                      "\nmessage: {1}".format(scene, message)
-            raise OrderException(message)
-
-        return True
+        scene, order = self.find_product(name, orderid)
+        result, ee_status = self.apply_complete(scene, order, processing_loc,
+                                                completed_file_location,
+                                                destination_cksum_file,
+                                                log_file_contents)
+        self.save_product(scene, order, ee_status)
+        return result
 
     def set_product_unavailable(self, name, orderid,
                                 processing_loc=None, error=None, note=None):
@@ -165,41 +136,9 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         :param note: note
         :return: True
         """
-
-        order_id = Scene.get('order_id', name, orderid)
-        order_source = Scene.get('order_source', name, orderid)
-
-        scene = Scene.by_name_orderid(name, order_id)
-        scene.status = 'unavailable'
-        scene.processing_location = processing_loc
-        scene.completion_date = datetime.datetime.now()
-        scene.log_file_contents = error
-        scene.note = note
-        scene.save()
-
-        if order_source == 'ee':
-            # update EE
-            ee_order_id = Scene.get('ee_order_id', name, orderid)
-            ee_unit_id = Scene.get('ee_unit_id', name, orderid)
-            try:
-                token = inventory.get_cached_session()
-                inventory.update_order_status(token, ee_order_id, ee_unit_id, 'R')
-            except Exception as e:
-                cache_key = 'lta.cannot.update'
-                lta_conn_failed_10mins = cache.get(cache_key)
-                if lta_conn_failed_10mins:
-                    logger.warn('Problem updating LTA order: {}'.format(e))
-                cache.set(cache_key, datetime.datetime.now())
-                scene.failed_lta_status_update = 'R'
-
-        try:
-            scene.save()
-        except DBConnectException as e:
-            num, message = e.args
-            msg = "DBConnect Exception ordering_provider set_product_unavailable " \
-                  "scene: {0}\nmessage: {1}".format(scene, message)
-            raise ProductionProviderException(msg)
-
+        scene, order = self.find_product(name, orderid)
+        self.apply_unavailable(scene, processing_loc, error, note)
+        self.save_product(scene, order, 'R')
         return True
 
     @staticmethod
@@ -212,20 +151,13 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         :return: True
         """
         try:
-            token = inventory.get_cached_session()
             Scene.bulk_update([p.id for p in products],
                               {'status': 'unavailable',
                                'completion_date': datetime.datetime.now(),
                                'note': reason})
-            for p in products:
-                if p.order_attr('order_source') == 'ee':
-                    try:
-                        inventory.update_order_status(token, p.order_attr('ee_order_id'), p.ee_unit_id, 'R')
-                    except Exception as e:
-                        # perhaps this doesn't need to be elevated to 'debug' status
-                        # as its a fairly regular occurrence
-                        logger.warn('Problem updating LTA order: {}'.format(e))
-                        p.update('failed_lta_status_update', 'R')
+            ee_updates = [(p, p.order_attr('ee_order_id'), 'R') for p in products
+                          if p.order_attr('order_source') == 'ee']
+            ProductionProvider.update_ee_statuses(ee_updates, record=True)
         except Exception as e:
             raise ProductionProviderException(e)
 
@@ -240,19 +172,15 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         :param status: what the status is to be set to
         :return: True
         """
-        order = Order.find(orderid)
-        scene = Scene.by_name_orderid(name, order.id)
-        if order.status == 'cancelled':
-            Scene.bulk_update([scene.id], Scene.cancel_opts())
-            return False
-        if processing_loc:
-            scene.processing_location = processing_loc
-        if status:
-            scene.status = status
-        scene.save()
-        log_str = "Scene status updated. order: {0}\n scene id/name: {1}/{2}\nstatus:{3}\nprocessing_location{4}\n "
-        logger.info(log_str.format(order.orderid, scene.id, scene.name, scene.status, scene.processing_location))
-        return True
+        scene, order = self.find_product(name, orderid)
+        result, _ = self.apply_update('update_status', scene, order,
+                                      processing_loc=processing_loc,
+                                      status=status)
+        self.save_product(scene, order)
+        if result:
+            log_str = "Scene status updated. order: {0}\n scene id/name: {1}/{2}\nstatus:{3}\nprocessing_location{4}\n "
+            logger.info(log_str.format(orderid, scene.id, scene.name, scene.status, scene.processing_location))
+        return result
 
     def update_product(self, action, name=None, orderid=None,
                        processing_loc=None, status=None, error=None,
@@ -273,50 +201,241 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         :param log_file_contents: new log file contents
         :return: True
         """
-        if action == 'update_status':
-            result = self.update_status(name, orderid,
-                                        processing_loc=processing_loc,
-                                        status=status)
+        if action not in ('update_status', 'set_product_error',
+                          'set_product_unavailable', 'mark_product_complete'):
+            return {'msg': ('{} is not an accepted action for '
+                            'update_product'.format(action))}
 
-        elif action == 'set_product_error':
-            result = self.set_product_error(name, orderid,
+        # all reads and writes for one product update share a single commit
+        with unit_of_work():
+            if action == 'update_status':
+                result = self.update_status(name, orderid,
                                             processing_loc=processing_loc,
-                                            error=error)
+                                            status=status)
 
-        elif action == 'set_product_unavailable':
-            result = self.set_product_unavailable(name, orderid,
-                                                  processing_loc=processing_loc,
-                                                  error=error, note=note)
-
-        elif action == 'mark_product_complete':
-            result = self.mark_product_complete(name, orderid,
+            elif action == 'set_product_error':
+                result = self.set_product_error(name, orderid,
                                                 processing_loc=processing_loc,
-                                                completed_file_location=completed_file_location,
-                                                destination_cksum_file=cksum_file_location,
-                                                log_file_contents=log_file_contents)
+                                                error=error)
 
-        else:
-            result = {'msg': ('{} is not an accepted action for '
-                              'update_product'.format(action))}
+            elif action == 'set_product_unavailable':
+                result = self.set_product_unavailable(name, orderid,
+                                                      processing_loc=processing_loc,
+                                                      error=error, note=note)
+
+            else:
+                result = self.mark_product_complete(name, orderid,
+                                                    processing_loc=processing_loc,
+                                                    completed_file_location=completed_file_location,
+                                                    destination_cksum_file=cksum_file_location,
+                                                    log_file_contents=log_file_contents)
 
         return result
 
-    def set_product_retry(self, name, orderid, processing_loc,
-                          error, note, retry_after, retry_limit=None):
+    # actions accepted by update_products, and the parameters each one takes
+    batch_actions = {'update_status': ('processing_loc', 'status'),
+                     'set_product_error': ('processing_loc', 'error'),
+                     'set_product_unavailable': ('processing_loc', 'error', 'note'),
+                     'mark_product_complete': ('processing_loc',
+                                               'completed_file_location',
+                                               'cksum_file_location',
+                                               'log_file_contents')}
+
+    def update_products(self, updates):
+        """
+        Apply a batch of product updates, of mixed actions, in a single
+        transaction.  Scenes are loaded with one query, written with
+        grouped UPDATEs, and the resulting EE status changes are sent
+        together once the transaction has been committed
+
+        :param updates: list of dicts, each with an 'action' (one of
+                        batch_actions), 'name', 'orderid' and the parameters
+                        accepted by update_product for that action
+        :return: list of results, one per update in the order received.
+                 True/False as returned by update_product, or a dict with
+                 a 'msg' key if the update could not be applied
+        """
+        if not isinstance(updates, list):
+            raise TypeError('update_products expects a list of updates')
+
+        results = [None] * len(updates)
+        pending = []
+        for idx, item in enumerate(updates):
+            if not isinstance(item, dict) or item.get('action') not in self.batch_actions:
+                results[idx] = {'msg': 'invalid update, action must be one of {}'
+                                       .format(', '.join(sorted(self.batch_actions)))}
+            elif not item.get('name') or not item.get('orderid'):
+                results[idx] = {'msg': 'invalid update, name and orderid are required'}
+            else:
+                pending.append((idx, item))
+
+        if not pending:
+            return results
+
+        with unit_of_work():
+            found = Scene.with_orders([(i['name'], i['orderid']) for _, i in pending])
+
+            scenes = {}
+            ee_updates = []
+            for idx, item in pending:
+                try:
+                    scene, order = found[(item['name'], item['orderid'])]
+                except KeyError:
+                    results[idx] = {'msg': 'product {} not found in order {}'
+                                           .format(item['name'], item['orderid'])}
+                    continue
+
+                params = {k: item.get(k) for k in self.batch_actions[item['action']]}
+                try:
+                    results[idx], ee_status = self.apply_update(item['action'], scene,
+                                                                order, **params)
+                except Exception as e:
+                    logger.critical('update_products could not apply {} to {} {}\n'
+                                    'exception: {}'.format(item['action'], item['name'],
+                                                           item['orderid'], e))
+                    results[idx] = {'msg': 'could not apply {}: {}'.format(item['action'], e)}
+                    continue
+
+                scenes[scene.id] = scene
+                if ee_status and order['order_source'] == 'ee':
+                    ee_updates.append((scene, order['ee_order_id'], ee_status))
+
+            Scene.save_many(list(scenes.values()))
+
+        # only tell EE once the batch is committed, failed sends are saved
+        # for handle_failed_ee_updates to retry
+        self.update_ee_statuses(ee_updates, record=True)
+
+        return results
+
+    def apply_update(self, action, scene, order, processing_loc=None,
+                     status=None, error=None, note=None,
+                     completed_file_location=None, cksum_file_location=None,
+                     log_file_contents=None):
         """
-        Set a product into retry status
+        Apply an update_product action to an already loaded scene, without
+        saving it or contacting EE
 
-        :param name: scene/collection name
-        :param orderid: order id, longname
-        :param processing_loc: processing computer name
-        :param error: error log
-        :param note: note to update
-        :param retry_after: retry after given timestamp
-        :param retry_limit: maximum number of tries
+        :param action: one of batch_actions
+        :param scene: Scene to update
+        :param order: dict of the scene's order columns, from Scene.with_orders
+        :return: (result, EE unit status to send or None)
         """
-        order = Order.find(orderid)
-        scene = Scene.by_name_orderid(name, order.id)
+        if action == 'update_status':
+            if order['status'] == 'cancelled':
+                self.apply_cancel(scene)
+                return False, None
+            if processing_loc:
+                scene.processing_location = processing_loc
+            if status:
+                scene.status = status
+            return True, None
+
+        elif action == 'set_product_unavailable':
+            self.apply_unavailable(scene, processing_loc, error, note)
+            return True, 'R'
+
+        elif action == 'mark_product_complete':
+            return self.apply_complete(scene, order, processing_loc,
+                                       completed_file_location,
+                                       cksum_file_location,
+                                       log_file_contents)
+
+        elif action == 'set_product_error':
+            return self.apply_error(scene, order, processing_loc, error)
+
+        raise ProductionProviderException('{} is not an accepted action'.format(action))
+
+    @staticmethod
+    def apply_cancel(scene):
+        for att, val in Scene.cancel_opts().items():
+            scene.__setattr__(att, val)
+
+    @staticmethod
+    def apply_unavailable(scene, processing_loc, error, note):
+        scene.status = 'unavailable'
+        scene.processing_location = processing_loc
+        scene.completion_date = datetime.datetime.now()
+        scene.log_file_contents = error
+        scene.note = note
+
+    def apply_complete(self, scene, order, processing_loc, completed_file_location,
+                       destination_cksum_file, log_file_contents):
+        orderid = order['orderid']
+        product_file = os.path.basename(completed_file_location)
+        cksum_file = os.path.basename(destination_cksum_file)
+
+        if order['status'] == 'cancelled':
+            if os.path.exists(completed_file_location):
+                scene.download_size = os.path.getsize(completed_file_location)
+                onlinecache.delete(orderid, filename=product_file)
+                onlinecache.delete(orderid, filename=cksum_file)
+            else:
+                logger.warning(f"ERR file was not found: {completed_file_location}")
+            self.apply_cancel(scene)
+            return False, None
+
+        base_url = config.url_for('distribution.cache')
+        scene.status = 'complete'
+        scene.processing_location = processing_loc
+        scene.product_distro_location = completed_file_location
+        scene.completion_date = datetime.datetime.now()
+        scene.cksum_distro_location = destination_cksum_file
+        scene.log_file_contents = log_file_contents
+        scene.product_dload_url = '{}/orders/{}/{}'.format(base_url, orderid, product_file)
+        scene.cksum_download_url = '{}/orders/{}/{}'.format(base_url, orderid, cksum_file)
+        try:
+            scene.download_size = os.path.getsize(completed_file_location)
+        except OSError:
+            logger.info("mark_product_complete could not find completed file location {}, "
+                        "marking it zero for now...".format(completed_file_location))
+            scene.download_size = 0
+
+        return True, 'C'
+
+    def apply_error(self, scene, order, processing_loc, error):
+        if scene.status == 'complete':
+            logger.error("Received set_product_error request for a complete product!\n"
+                         "Order ID: {}\nProduct: {}".format(order['orderid'], scene.name))
+            return {"error": "attempted to set scene to error that was already marked complete"}, None
+
+        resolution = None
+        if scene.name != 'plot':
+            resolution = errors.resolve(error, scene.name)
 
+        logger.info("\n\n*** set_product_error: orderid {0}, "
+                    "scene id {1} , scene name {2},\n"
+                    "error {4!r},\n"
+                    "resolution {3}\n\n".format(order['orderid'], scene.id,
+                                                scene.name, resolution, error))
+
+        if resolution is not None:
+            if resolution.status == 'submitted':
+                scene.status = 'submitted'
+                scene.note = ''
+                return True, None
+            elif resolution.status == 'unavailable':
+                self.apply_unavailable(scene, processing_loc, error, resolution.reason)
+                return True, 'R'
+            elif resolution.status == 'retry':
+                try:
+                    self.apply_retry(scene, processing_loc, error,
+                                     resolution.reason,
+                                     resolution.extra['retry_after'],
+                                     resolution.extra['retry_limit'])
+                    return True, None
+                except Exception as e:
+                    logger.info('Exception setting product.id {} {} '
+                                'to retry: {}'
+                                .format(scene.id, scene.name, e))
+
+        scene.status = 'error'
+        scene.processing_location = processing_loc
+        scene.log_file_contents = error
+        return True, None
+
+    @staticmethod
+    def apply_retry(scene, processing_loc, error, note, retry_after, retry_limit=None):
         retry_count = scene.retry_count if scene.retry_count else 0
 
         if not retry_limit:
@@ -328,7 +447,7 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         new_retry_count = retry_count + 1
 
         if new_retry_count > retry_limit:
-            raise ProductionProviderException('Retry limit exceeded, name: {}'.format(name))
+            raise ProductionProviderException('Retry limit exceeded, name: {}'.format(scene.name))
 
         scene.status = 'retry'
         scene.retry_count = new_retry_count
@@ -337,77 +456,123 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         scene.log_file_contents = error
         scene.processing_location = processing_loc
         scene.note = note
-        scene.save()
 
-        return True
+    @staticmethod
+    def unit_ranges(unit_numbers):
+        """
+        Collapse EE unit numbers into runs of consecutive numbers, each
+        run can be updated with a single setunitstatus call
 
-    def set_product_error(self, name, orderid, processing_loc, error):
+        :param unit_numbers: iterable of integer unit numbers
+        :return: list of lists
         """
-        Marks a scene in error and accepts the log file contents
-        :param name: name of scene to update
-        :param orderid: order id of scene to update
-        :param processing_loc: where command to update scene came from
-        :param error: error message from processing
-        :return: True
+        runs = []
+        for unit in sorted(set(unit_numbers)):
+            if runs and unit == runs[-1][-1] + 1:
+                runs[-1].append(unit)
+            else:
+                runs.append([unit])
+        return runs
+
+    @staticmethod
+    def update_ee_statuses(scene_updates, record=False):
         """
-        order = Order.find(orderid)
-        product = Scene.by_name_orderid(name, order.id)
-        # attempt to determine the disposition of this error
-        resolution = None
+        Send unit status changes to EE, grouped by EE order and status,
+        with one call per run of consecutive unit numbers. Scenes which
+        could not be updated have failed_lta_status_update set so
+        handle_failed_ee_updates can try again
 
-        if product.status == 'complete':
-            # Mesos tasks occasionaly exit abnormally, even though processing completed successfully.
-            # When that happens, the ESPA framework will try to set the scene to error status
-            logger.error(
-                "Received set_product_error request for a complete product!\nOrder ID: {}\nProduct: {}".format(orderid,
-                                                                                                               name))
-            return {"error": "attempted to set scene to error that was already marked complete"}
+        :param scene_updates: list of (Scene, ee_order_id, status) tuples
+        :param record: also save failed_lta_status_update for the failures,
+                       otherwise it is left for the caller to save
+        :return: list of Scenes which failed to update
+        """
+        if not scene_updates:
+            return []
 
-        if name != 'plot':
-            resolution = errors.resolve(error, name)
+        groups = {}
+        for scene, ee_order_id, status in scene_updates:
+            groups.setdefault((ee_order_id, status), []).append(scene)
 
-        logger.info("\n\n*** set_product_error: orderid {0}, "
-                    "scene id {1} , scene name {2},\n"
-                    "error {4!r},\n"
-                    "resolution {3}\n\n".format(order.orderid, product.id,
-                                                product.name, resolution, error))
+        failed = []
+        try:
+            token = inventory.get_cached_session()
+        except Exception as e:
+            logger.warn('Problem updating LTA orders: {}'.format(e))
+            token = None
 
-        if resolution is not None:
-            if resolution.status == 'submitted':
-                product.status = 'submitted'
-                product.note = ''
-                product.save()
-            elif resolution.status == 'unavailable':
-                self.set_product_unavailable(product.name,
-                                             order.orderid,
-                                             processing_loc,
-                                             error,
-                                             resolution.reason)
-            elif resolution.status == 'retry':
+        for (ee_order_id, status), scenes in groups.items():
+            units, runs = {}, []
+            for scene in scenes:
+                try:
+                    units.setdefault(int(scene.ee_unit_id), []).append(scene)
+                except (TypeError, ValueError):
+                    # no usable unit number, send it on its own
+                    if scene.ee_unit_id not in units:
+                        runs.append([scene.ee_unit_id])
+                    units.setdefault(scene.ee_unit_id, []).append(scene)
+            runs += ProductionProvider.unit_ranges(u for u in units if isinstance(u, int))
+
+            for run in runs:
                 try:
-                    self.set_product_retry(product.name,
-                                           order.orderid,
-                                           processing_loc,
-                                           error,
-                                           resolution.reason,
-                                           resolution.extra['retry_after'],
-                                           resolution.extra['retry_limit'])
+                    if token is None:
+                        raise ProductionProviderException('no LTA session')
+                    resp = inventory.update_order_status(token, ee_order_id, run[0],
+                                                         status, run[-1])
+                    if isinstance(resp, dict) and not resp.get('success'):
+                        raise ProductionProviderException(resp.get('message'))
                 except Exception as e:
-                    logger.info('Exception setting product.id {} {} '
-                                'to retry: {}'
-                                .format(product.id, name, e))
-                    product.status = 'error'
-                    product.processing_location = processing_loc
-                    product.log_file_contents = error
-                    product.save()
-        else:
-            product.status = 'error'
-            product.processing_location = processing_loc
-            product.log_file_contents = error
-            product.save()
+                    cache_key = 'lta.cannot.update'
+                    if cache.get(cache_key):
+                        logger.warn('Problem updating LTA order {} units {}-{}: {}'
+                                    .format(ee_order_id, run[0], run[-1], e))
+                    cache.set(cache_key, datetime.datetime.now())
+                    for scene in (s for u in run for s in units[u]):
+                        scene.failed_lta_status_update = status
+                        failed.append(scene)
+
+        if record and failed:
+            by_status = {}
+            for scene in failed:
+                by_status.setdefault(scene.failed_lta_status_update, []).append(scene.id)
+            for status, ids in by_status.items():
+                Scene.bulk_update(ids, {'failed_lta_status_update': status})
+
+        return failed
+
+    def set_product_retry(self, name, orderid, processing_loc,
+                          error, note, retry_after, retry_limit=None):
+        """
+        Set a product into retry status
+
+        :param name: scene/collection name
+        :param orderid: order id, longname
+        :param processing_loc: processing computer name
+        :param error: error log
+        :param note: note to update
+        :param retry_after: retry after given timestamp
+        :param retry_limit: maximum number of tries
+        """
+        scene, order = self.find_product(name, orderid)
+        self.apply_retry(scene, processing_loc, error, note, retry_after, retry_limit)
+        self.save_product(scene, order)
 
         return True
 
+    def set_product_error(self, name, orderid, processing_loc, error):
+        """
+        Marks a scene in error and accepts the log file contents
+        :param name: name of scene to update
+        :param orderid: order id of scene to update
+        :param processing_loc: where command to update scene came from
+        :param error: error message from processing
+        :return: True
+        """
+        scene, order = self.find_product(name, orderid)
+        result, ee_status = self.apply_error(scene, order, processing_loc, error)
+        self.save_product(scene, order, ee_status)
+        return result
+
     def converted_opts(self, scene_id, product_opts):
         if scene_id == 'plot':
             options = {}
@@ -431,24 +596,30 @@ class ProductionProvider(ProductionProviderInterfaceV0):
 
         if non_plot_ids:
             urls = dict()
-            unavailable, available = list(), list()
+            unavailable = list()
             token = inventory.get_session()
-            for dataset, ids in inventory.split_by_dataset(non_plot_ids).items():
+            # datasets and chunks are resolved concurrently, the database
+            # updates stay on this thread
+            for dataset, ids, result, error in inventory.map_chunks(
+                    inventory.verified_download_urls, token, non_plot_ids):
+                if error is not None:
+                    logger.error('Problem getting URLs: {}'.format(error), exc_info=error)
+                    continue
+                # {'LT04_L1TP_007057_19871226_20170210_01_T1': True,
+                # 'LT04_L1TP_007057_19880111_20170210_01_T1': False, ...}
+                verified, found = result
+                unavailable.extend(_id for _id, _availability in verified.items() if not _availability)
+                urls.update(found)
+
+            if unavailable:
+                msg = "Unavailable scenes found in request for download URLs. " \
+                      "Marking unavailable ids: {}\n".format(unavailable)
+                logger.warn(msg)
                 try:
-                    verified = inventory.verify_scenes(token, ids, dataset)
-                    # {'LT04_L1TP_007057_19871226_20170210_01_T1': True,
-                    # 'LT04_L1TP_007057_19880111_20170210_01_T1': False, ...}
-                    for _id, _availability in verified.items():
-                        available.append(_id) if _availability else unavailable.append(_id)
-                    if unavailable:
-                        msg = "Unavailable scenes found in request for download URLs. " \
-                              "Marking unavailable ids: {}\n".format(unavailable)
-                        logger.warn(msg)
-                        unavailable_scenes = Scene.where({'name': unavailable})
-                        self.set_products_unavailable(unavailable_scenes, "Scene no longer available")
-                    urls.update(inventory.download_urls(token, available, dataset))
+                    unavailable_scenes = Scene.where({'name': unavailable})
+                    self.set_products_unavailable(unavailable_scenes, "Scene no longer available")
                 except Exception as e:
-                    logger.error('Problem getting URLs: {}'.format(e), exc_info=True)
+                    logger.error('Problem marking scenes unavailable: {}'.format(e), exc_info=True)
             if encode_urls:
                 urls = {k: urllib.parse.quote(u, '') for k, u in urls.items()}
 
@@ -655,7 +826,7 @@ class ProductionProvider(ProductionProviderInterfaceV0):
             if product.sr_date_restricted():
                 status = 'unavailable'
                 note = 'Missing Auxiliary data - cannot process SR'
-                logger.info('check ee unavailable: {}'.format(product.__dict__))
+                logger.info('check ee unavailable: {}'.format(product.fields()))
 
             scene_dict = {'name': product.product_id,
                           'sensor_type': sensor_type,
@@ -722,35 +893,30 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         :param order_id: order id used in the system
         """
         missing_scenes = []
+        scene_updates = []
         scenes = Scene.where({'order_id': order_id,
                               'ee_unit_id': tuple([s['unitNumber'] for s in ee_scenes])})
-        token = inventory.get_cached_session()
+        by_unit = dict()
+        for so in scenes:
+            by_unit.setdefault(str(so.ee_unit_id), so)
+
         for s in ee_scenes:
-            unit_number = s['unitNumber']
-            unit_scenes = [so for so in scenes if str(so.ee_unit_id) == unit_number]
+            scene = by_unit.get(str(s['unitNumber']))
 
-            if unit_scenes:
-                scene = unit_scenes[0]
+            if scene is not None:
                 if scene.status == 'complete':
                     status = 'C'
                 elif scene.status in ('unavailable', 'cancelled'):
                     status = 'R'
                 else:
-                    status = 'I'
                     continue  # No need to update scenes in progress
-                try:
-                    inventory.update_order_status(token, eeorder_num, unit_number, status)
-                except Exception as e:
-                    cache_key = 'lta.cannot.update'
-                    lta_conn_failed_10mins = cache.get(cache_key)
-                    if lta_conn_failed_10mins:
-                        logger.warn("Error updating lta for scene: {}\n{}".format(scene.id, e))
-                    cache.set(cache_key, datetime.datetime.now())
-                    scene.update('failed_lta_status_update', status)
+                scene_updates.append((scene, eeorder_num, status))
             else:
                 # scene insertion was missed initially, add it now
                 missing_scenes.append(s)
 
+        self.update_ee_statuses(scene_updates, record=True)
+
         if missing_scenes:
             # There appear to be scenes in this order which we didn't receive the
             # first go around, try adding them now
@@ -805,13 +971,19 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         product_tram_ids = set([product.tram_order_id for product in products])
         sorted_tram_ids = sorted(product_tram_ids)[:500]
 
-        rejected = []
-        available = []
+        rejected = set()
+        available = set()
 
         token = inventory.get_cached_session()
+        statuses = inventory.get_order_statuses(token, sorted_tram_ids)
 
         for tid in sorted_tram_ids:
-            order_status = inventory.get_order_status(token, tid)
+            order_status = statuses.get(tid)
+            if isinstance(order_status, Exception) or not order_status:
+                # try again on the next run
+                logger.warn('Could not retrieve status for tram order {}: {}'
+                            .format(tid, order_status))
+                continue
 
             # There are a variety of product statuses that come back from tram
             # on this call.  I is inprocess, Q is queued for the backend system,
@@ -821,9 +993,9 @@ class ProductionProvider(ProductionProviderInterfaceV0):
             # duplicates will also be marked C
             for unit in order_status['units']:
                 if unit['statusCode'] == 'R':
-                    rejected.append(unit['orderingId'])  # or 'displayId', 'entityId'
+                    rejected.add(unit['orderingId'])  # or 'displayId', 'entityId'
                 elif unit['statusCode'] == 'C':
-                    available.append(unit['orderingId'])
+                    available.add(unit['orderingId'])
 
         # Go find all the tram units that were rejected and mark them
         # unavailable in our database.  Note that we are not looking for
@@ -1027,13 +1199,33 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         """
         logger.info("Handling submitted plot products...")
 
-        plot_orders = [Order.find(s.order_id) for s in plot_scenes]
-        logger.info("Found {0} submitted plot orders".format(len(plot_orders)))
+        order_ids = tuple({s.order_id for s in plot_scenes})
+        logger.info("Found {0} submitted plot orders".format(len(order_ids)))
+        if not order_ids:
+            return True
 
-        for order in plot_orders:
-            product_count = order.scene_status_count()
-            complete_count = order.scene_status_count('complete')
-            unavailable_count = order.scene_status_count('unavailable')
+        sql = ('SELECT o.id, o.orderid, count(*) AS products, '
+               'count(*) FILTER (WHERE s.status = \'complete\') AS complete, '
+               'count(*) FILTER (WHERE s.status = \'unavailable\') AS unavailable, '
+               'array_agg(s.id) FILTER (WHERE s.sensor_type = \'plot\') AS plots '
+               'FROM ordering_scene s '
+               'JOIN ordering_order o ON o.id = s.order_id '
+               'WHERE s.order_id IN %s '
+               'GROUP BY o.id, o.orderid')
+        try:
+            with db_instance() as db:
+                db.select(sql, (order_ids,))
+                counts = db.dictfetchall
+        except DBConnectException as e:
+            logger.critical('Error counting plot order scenes: {}\nsql: {}'.format(e, sql))
+            raise ProductionProviderException(e)
+
+        oncache, unavailable, too_many = [], [], []
+        for order in counts:
+            product_count = order['products']
+            complete_count = order['complete']
+            unavailable_count = order['unavailable']
+            plots_in_order = order['plots'] or []
 
             # if there is only 1 product left that is not done, it must be
             # the plot product. Will verify this in next step.  Plotting
@@ -1042,22 +1234,26 @@ class ProductionProvider(ProductionProviderInterfaceV0):
             logger.info(log_msg.format(product_count, unavailable_count, complete_count))
 
             if product_count - (unavailable_count + complete_count) == 1:
-                plots_in_order = order.scenes({'sensor_type': 'plot'})
                 if len(plots_in_order) == 1:
-                    for p in plots_in_order:
-                        if complete_count == 0:
-                            p.status = 'unavailable'
-                            p.note = 'No input products were available for plotting and statistics'
-                            logger.info('No input products available for '
-                                        'plotting in order {0}'.format(order.orderid))
-                        else:
-                            p.status = 'oncache'
-                            p.note = ''
-                            logger.info("{0} plot is on cache".format(order.orderid))
-                        p.save()
+                    if complete_count == 0:
+                        unavailable.extend(plots_in_order)
+                        logger.info('No input products available for '
+                                    'plotting in order {0}'.format(order['orderid']))
+                    else:
+                        oncache.extend(plots_in_order)
+                        logger.info("{0} plot is on cache".format(order['orderid']))
                 else:
                     logger.critical('{}'.format(plots_in_order))
-                    raise ValueError('Too many ({n}) plots in order {oid}'.format(n=len(plots_in_order), oid=order.id))
+                    too_many.append((len(plots_in_order), order['id']))
+
+        if unavailable:
+            Scene.bulk_update(unavailable, {'status': 'unavailable',
+                                            'note': 'No input products were available for plotting and statistics'})
+        if oncache:
+            Scene.bulk_update(oncache, {'status': 'oncache', 'note': ''})
+
+        if too_many:
+            raise ValueError('Too many ({n}) plots in order {oid}'.format(n=too_many[0][0], oid=too_many[0][1]))
         return True
 
     def send_completion_email(self, order):
@@ -1085,21 +1281,33 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         # find all scenes that are not complete
         scenes = order.scenes({'status NOT ': ('complete', 'unavailable')})
         if len(scenes) == 0:
-            logger.info('Completing order: {0}'.format(order.orderid))
-            # only send the email if this was an espa order.
-            if order.order_source == 'espa' and not order.completion_email_sent:
-                try:
-                    self.send_completion_email(order)
-                    order.completion_email_sent = datetime.datetime.now()
-                    order.completion_date = datetime.datetime.now()
-                    order.status = 'complete'
-                    order.save()
-                except Exception as e:
-                    logger.critical('Error calling send_completion_email\nexception: {}'.format(e))
-            else:
+            self.complete_order(order)
+
+        return True
+
+    def complete_order(self, order):
+        """
+        Mark an order with no open scenes complete, sending the
+        completion email first for espa orders. If the email can not be
+        sent the order is left open, so it will be tried again
+        :param order: Order
+        :return: True
+        """
+        logger.info('Completing order: {0}'.format(order.orderid))
+        # only send the email if this was an espa order.
+        if order.order_source == 'espa' and not order.completion_email_sent:
+            try:
+                self.send_completion_email(order)
+                order.completion_email_sent = datetime.datetime.now()
                 order.completion_date = datetime.datetime.now()
                 order.status = 'complete'
                 order.save()
+            except Exception as e:
+                logger.critical('Error calling send_completion_email\nexception: {}'.format(e))
+        else:
+            order.completion_date = datetime.datetime.now()
+            order.status = 'complete'
+            order.save()
 
         return True
 
@@ -1127,78 +1335,187 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         """
         Checks all open orders in the system and marks them complete if all
         required scene processing is done
+
+        Orders which need no completion email are completed with a single
+        update, only the espa orders still waiting on their email are
+        loaded and completed one at a time
+        :param orders: list of Orders or order ids
         :return: True
         """
-        [self.update_order_if_complete(o) for o in orders]
+        order_ids = tuple(o.id if isinstance(o, Order) else o for o in orders)
+        if not order_ids:
+            return True
+
+        finished = ('o.status = \'ordered\' AND o.id IN %(ids)s '
+                    'AND NOT EXISTS (SELECT 1 FROM ordering_scene s '
+                    'WHERE s.order_id = o.id AND s.status NOT IN %(done)s) ')
+        params = {'ids': order_ids, 'done': ('complete', 'unavailable')}
+
+        complete_sql = ('UPDATE ordering_order o '
+                        'SET status = \'complete\', completion_date = now() '
+                        'WHERE ' + finished +
+                        'AND (o.order_source IS DISTINCT FROM \'espa\' '
+                        'OR o.completion_email_sent IS NOT NULL) '
+                        'RETURNING o.orderid')
+        email_sql = ('SELECT o.id FROM ordering_order o WHERE ' + finished +
+                     'AND o.order_source = \'espa\' '
+                     'AND o.completion_email_sent IS NULL')
+
+        log_sql = ''
+        try:
+            with db_instance() as db:
+                log_sql = db.cursor.mogrify(complete_sql, params)
+                db.select(complete_sql, params)
+                completed = [r['orderid'] for r in db]
+                db.commit()
+
+                log_sql = db.cursor.mogrify(email_sql, params)
+                db.select(email_sql, params)
+                email_ids = [r['id'] for r in db]
+        except DBConnectException as e:
+            logger.critical('Error finalizing orders: {}\nsql: {}'.format(e, log_sql))
+            raise ProductionProviderException(e)
+
+        for orderid in completed:
+            logger.info('Completing order: {0}'.format(orderid))
+
+        if email_ids:
+            for order in Order.where({'id': email_ids}):
+                self.complete_order(order)
+
         return True
 
     def purge_orders(self, send_email=False):
         """
         Will move any orders older than X days to purged status and will also
         remove the files from disk
+
+        Purged orders whose files could not be removed are still on disk
+        for the next purge to find, and their deletion is tried again
         :param send_email: boolean
         :return: True
         """
         days = config.get('policy.purge_orders_after')
         cutoff = datetime.datetime.now() - datetime.timedelta(days=int(days))
-        orders = Order.where({'status': 'complete', 'completion_date <': cutoff})
         start_capacity = onlinecache.capacity()
 
         logger.info('Using purge policy of {0} days'.format(days))
-        logger.info('Purging {0} orders from the active record.'.format(len(orders)))
         logger.info('Starting cache capacity:{0}'.format(start_capacity))
 
-        for order in orders:
-            try:
-                # with transaction.atomic():
-                order.update('status', 'purged')
-                for product in order.scenes():
-                    product.status = 'purged'
-                    product.log_file_contents = ''
-                    product.product_distro_location = ''
-                    product.product_dload_url = ''
-                    product.cksum_distro_location = ''
-                    product.cksum_download_url = ''
-                    product.job_name = ''
-                    product.save()
-
-                if onlinecache.exists(order.orderid):
-                    # bulk update product status, delete unnecessary field data
-                    logger.info('Deleting {0} from online cache disk'.format(order.orderid))
-                    onlinecache.delete(order.orderid)
-            except onlinecache.OnlineCacheException:
-                logger.critical('Could not delete {0} from the online cache'.format(order.orderid))
-            except Exception as e:
-                logger.critical('Exception purging {0}\nexception: {1}'.format(order.orderid, e))
+        # purge the orders and clear out their scenes in one statement,
+        # counting the scenes purged for each order
+        sql = ('WITH purged_orders AS ('
+               ' UPDATE ordering_order SET status = \'purged\''
+               ' WHERE status = \'complete\' AND completion_date < %s'
+               ' RETURNING id, orderid), '
+               'purged_scenes AS ('
+               ' UPDATE ordering_scene s SET status = \'purged\','
+               ' log_file_contents = \'\', product_distro_location = \'\','
+               ' product_dload_url = \'\', cksum_distro_location = \'\','
+               ' cksum_download_url = \'\', job_name = \'\''
+               ' FROM purged_orders o WHERE s.order_id = o.id'
+               ' RETURNING s.order_id) '
+               'SELECT o.orderid, count(s.order_id) AS scenes '
+               'FROM purged_orders o '
+               'LEFT JOIN purged_scenes s ON s.order_id = o.id '
+               'GROUP BY o.orderid ORDER BY o.orderid')
+        try:
+            with db_instance() as db:
+                db.select(sql, (cutoff,))
+                purged = [(r['orderid'], r['scenes']) for r in db]
+                db.commit()
+        except DBConnectException as e:
+            logger.critical('Error purging orders: {}\nsql: {}'.format(e, sql))
+            raise ProductionProviderException(e)
+
+        logger.info('Purged {0} orders from the active record.'.format(len(purged)))
+
+        # files are only removed once the purge has been committed
+        try:
+            self.delete_purged_orders([orderid for orderid, _ in purged])
+        except Exception as e:
+            logger.critical('Could not delete purged orders from the online cache: {}'.format(e))
 
         end_capacity = onlinecache.capacity()
         logger.info('Ending cache capacity:{0}'.format(end_capacity))
 
-        orders = [{o.orderid: len(o.scenes())} for o in orders]
+        orders = [{orderid: count} for orderid, count in purged]
         if send_email is True:
             logger.info('Sending purge report')
             emails.send_purge_report(start_capacity, end_capacity, orders)
 
         return True
 
+    @staticmethod
+    def delete_purged_orders(orderids):
+        """
+        Remove purged orders from the online cache disk, along with any
+        left over from earlier purges which could not be removed
+
+        :param orderids: orders purged from the active record
+        :return: list of orderids which could not be removed
+        """
+        orderids = set(orderids) | set(ProductionProvider.purged_on_disk())
+        if not orderids:
+            return []
+
+        try:
+            results = onlinecache.delete_many(orderids)
+        except Exception as e:
+            logger.critical('Could not delete purged orders from the online cache: {}'.format(e))
+            results = dict.fromkeys(orderids, 'failed')
+
+        failed = sorted(o for o, status in results.items() if status == 'failed')
+        for orderid in failed:
+            logger.critical('Could not delete {0} from the online cache'.format(orderid))
+        return failed
+
+    @staticmethod
+    def purged_on_disk():
+        """
+        Orders still on the online cache disk which were already purged
+
+        :return: list of orderids
+        """
+        try:
+            on_disk = tuple(onlinecache.list_orders())
+        except Exception as e:
+            logger.critical('Could not list the online cache: {}'.format(e))
+            return []
+        if not on_disk:
+            return []
+
+        sql = ('SELECT orderid FROM ordering_order '
+               'WHERE status = \'purged\' AND orderid IN %s')
+        try:
+            with db_instance() as db:
+                db.select(sql, (on_disk,))
+                return [r['orderid'] for r in db]
+        except DBConnectException as e:
+            logger.critical('Error finding purged orders on disk: {}\nsql: {}'.format(e, sql))
+            return []
+
     @staticmethod
     def handle_failed_ee_updates(scenes):
         n_failed = len(scenes)
-        token = inventory.get_cached_session()
         if n_failed:
             logger.critical('Failed LTA status count: {} scenes'.format(n_failed))
-        for s in scenes:
+
+        updates = [(s, s.order_attr('ee_order_id'), s.failed_lta_status_update)
+                   for s in scenes]
+        # LTA could still be unavailable, these will be tried again later
+        failed = {s.id for s in ProductionProvider.update_ee_statuses(updates)}
+        if failed:
+            logger.warn('Failed EE update retry failed again for '
+                        'scenes {}'.format(sorted(failed)))
+
+        updated = [s.id for s in scenes if s.id not in failed]
+        if updated:
             try:
-                inventory.update_order_status(token, s.order_attr('ee_order_id'), s.ee_unit_id,
-                                              s.failed_lta_status_update)
-                s.update('failed_lta_status_update', None)
-            except DBConnectException as e:
+                Scene.bulk_update(updated, {'failed_lta_status_update': None})
+            except SceneException as e:
                 raise ProductionProviderException('ordering_scene update failed for '
                                                   'handle_failed_ee_updates: {}'.format(e))
-            except Exception as e:
-                # LTA could still be unavailable, log and it'll be tried again later
-                logger.warn('Failed EE update retry failed again for '
-                            'scene {}\n{}'.format(s.id, e))
         return True
 
     def handle_orders(self, username=None):
@@ -1288,8 +1605,7 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         self.calc_scene_download_sizes(pending_order_ids)
 
         # finalize orders
-        for order in pending_orders:
-            self.update_order_if_complete(order)
+        self.finalize_orders(pending_order_ids)
 
         cache_key = 'orders_last_purged'
         result = cache.get(cache_key)
@@ -0,0 +1,164 @@
+"""
+Compiled order validation schemas
+
+Building a jsonschema validator (and the addict.Dict view of the schema
+used by the custom validation rules) is done once per schema, and then
+reused for every order.
+
+The per-sensor 'inputs' and 'products' arrays are where nearly all of
+an order's values are, so simple string item schemas (type, pattern and
+enum) are pulled out of the jsonschema schema and checked directly with
+precompiled regexes and sets, producing the same ValidationErrors
+jsonschema would
+"""
+import copy
+import re
+import threading
+from collections import deque
+
+import jsonschema
+from jsonschema.exceptions import ValidationError
+from addict import Dict
+
+# Item schema keywords which the fast item checks implement
+FAST_KEYWORDS = frozenset(('type', 'pattern', 'enum'))
+
+# Distinct schemas kept compiled by each process
+MAX_COMPILED = 16
+
+
+class OrderView(Dict):
+    """
+    addict.Dict over an order, for attribute access in the custom rules
+
+    Unlike Dict(order) nothing is converted up front, nested objects are
+    wrapped (shallowly) as they are used, so the size of the inputs lists
+    does not matter.  Missing keys give an empty OrderView, as with Dict
+    """
+    @classmethod
+    def _hook(cls, item):
+        return item
+
+    def __getitem__(self, name):
+        value = super(OrderView, self).__getitem__(name)
+        if type(value) is dict:
+            return OrderView(value)
+        return value
+
+
+class ItemCheck(object):
+    """ Precompiled checks for the string items of one array property """
+    __slots__ = ('path', 'pattern', 'regex', 'enum', 'members')
+
+    def __init__(self, path, items):
+        self.path = path
+        self.pattern = items.get('pattern')
+        self.regex = re.compile(self.pattern) if self.pattern else None
+        self.enum = items.get('enum')
+        self.members = frozenset(self.enum) if self.enum is not None else None
+
+    def iter_errors(self, values):
+        if not isinstance(values, list):
+            # the array itself is reported by jsonschema
+            return
+        for i, value in enumerate(values):
+            is_str = isinstance(value, str)
+            if not is_str:
+                yield ValidationError('{!r} is not of type {!r}'.format(value, 'string'),
+                                      validator='type', validator_value='string',
+                                      instance=value, path=deque(self.path + (i,)))
+            elif self.regex is not None and not self.regex.search(value):
+                # as with jsonschema, pattern only applies to strings
+                yield ValidationError('{!r} does not match {!r}'.format(value, self.pattern),
+                                      validator='pattern', validator_value=self.pattern,
+                                      instance=value, path=deque(self.path + (i,)))
+            if self.members is not None and value not in (self.members if is_str else self.enum):
+                yield ValidationError('{!r} is not one of {!r}'.format(value, self.enum),
+                                      validator='enum', validator_value=self.enum,
+                                      instance=value, path=deque(self.path + (i,)))
+
+
+def split_item_checks(schema):
+    """
+    Pull the simple string item schemas out of top-level object properties
+    (<sensor>.inputs and <sensor>.products)
+
+    :param schema: order validation schema
+    :return: (schema without those item schemas, {property: [ItemCheck]})
+    """
+    reduced = copy.deepcopy(schema)
+    checks = dict()
+    for name, prop in reduced.get('properties', {}).items():
+        if not isinstance(prop, dict) or prop.get('type') != 'object':
+            continue
+        for field, sub in prop.get('properties', {}).items():
+            items = sub.get('items') if isinstance(sub, dict) else None
+            if (sub.get('type') != 'array' or not isinstance(items, dict)
+                    or items.get('type') != 'string' or not set(items) <= FAST_KEYWORDS):
+                continue
+            checks.setdefault(name, []).append(ItemCheck((name, field), items))
+            del sub['items']
+    return reduced, checks
+
+
+class CompiledSchema(object):
+    """
+    A validation schema, with its validator built
+
+    The schema must not be changed once compiled
+    """
+    def __init__(self, schema, fast=True):
+        self.schema = schema
+        self.attrs = Dict(schema)
+        self.fast = fast
+
+        cls = jsonschema.validators.validator_for(schema)
+        if fast:
+            reduced, self.item_checks = split_item_checks(schema)
+        else:
+            reduced, self.item_checks = schema, dict()
+        self.validator = cls(reduced)
+
+    def iter_errors(self, order):
+        """
+        :param order: the order, as a plain dict
+        :return: generator of jsonschema ValidationErrors
+        """
+        for error in self.validator.iter_errors(order):
+            yield error
+
+        if not isinstance(order, dict):
+            return
+        for name, checks in self.item_checks.items():
+            prop = order.get(name)
+            if not isinstance(prop, dict):
+                continue
+            for check in checks:
+                if check.path[-1] in prop:
+                    for error in check.iter_errors(prop[check.path[-1]]):
+                        yield error
+
+
+_compiled = dict()
+_compiled_lock = threading.Lock()
+
+
+def compiled(schema, fast=True):
+    """
+    Retrieve the CompiledSchema for a schema, building it the first time
+
+    :param schema: order validation schema (e.g. request_schema)
+    :param fast: check string array items outside of jsonschema
+    :return: CompiledSchema
+    """
+    key = (id(schema), fast)
+    entry = _compiled.get(key)
+    if entry is None or entry.schema is not schema:
+        with _compiled_lock:
+            entry = _compiled.get(key)
+            if entry is None or entry.schema is not schema:
+                entry = CompiledSchema(schema, fast)
+                if len(_compiled) >= MAX_COMPILED:
+                    _compiled.clear()
+                _compiled[key] = entry
+    return entry
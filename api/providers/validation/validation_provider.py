@@ -13,47 +13,48 @@ A ValidationException is raised if any errors are encountered in the order.
 
 from decimal import Decimal
 import copy
-import yaml
-import os
 import math
 from collections import Mapping
 from addict import Dict
-import jsonschema
 from api import ValidationException
 import api.providers.ordering.ordering_provider as ordering
 from api.providers.validation.validation_schema import BaseValidationSchema
 from api.providers.validation import MultipleValidationError, SchemaError
+from api.providers.validation.compiled import OrderView, compiled
 import api.domain.sensor as sn
-from api import __location__
+from api.domain import restrictions
 
 
 class ValidationProvider(object):
     """
     Provide custom order validation checks
     """
+    # check the sensor inputs/products items outside of jsonschema
+    fast_items = True
+
     def __init__(self):
         self.validator   = None
+        self.order       = None
         self.data_source = None
         self.username    = None
         self.sensors     = ()
         self._errors     = []
         self._itemcount  = 0
-        self.restricted  = Dict()
+        self.restricted  = None
         self.schema      = Dict()
 
     def validate(self, data_source, username, schema=None):
         self._errors     = []
         self._itemcount  = 0
         self.username    = username
-        self.data_source = Dict(data_source)
+        self.order       = data_source
+        self.data_source = OrderView(data_source)
         self.sensors     = self.selected_sensors()
-        self.restricted  = self.yaml_to_dict()
+        self.restricted  = restrictions.index()
 
-        if not schema:
-            self.schema = Dict(BaseValidationSchema.request_schema)
-        else:
-            self.schema = Dict(schema)
-        self.validator = jsonschema.validators.validator_for(self.schema)
+        self.validator   = compiled(schema or BaseValidationSchema.request_schema,
+                                    fast=self.fast_items)
+        self.schema      = self.validator.attrs
 
         try:
             self.validation_steps()
@@ -65,13 +66,7 @@ class ValidationProvider(object):
             msg = f"Schema errors:\n{message}"
             raise ValidationException(msg=msg)
 
-        return self.massage_formatting(self.data_source).to_dict()
-
-    @staticmethod
-    def yaml_to_dict(path=__location__, filename='domain/restricted.yaml'):
-        with open(os.path.join(path, filename), 'r') as f:
-            r = Dict(yaml.safe_load(f))
-        return r
+        return self.massage_formatting(self.order)
 
     def selected_sensors(self):
         """Determine which sensors are present in the order"""
@@ -79,8 +74,7 @@ class ValidationProvider(object):
 
     def validation_steps(self):
         # perform validation of order structure and contents using our base schema
-        self.validator = self.validator(self.schema)
-        validation_errors = [e for e in self.validator.iter_errors(self.data_source)]
+        validation_errors = [e for e in self.validator.iter_errors(self.order)]
         for err in validation_errors:
             msg = self.custom_message(err)
             if msg:
@@ -479,16 +473,16 @@ class ValidationProvider(object):
         if not self.data_source.plot_statistics:  # == False
             return
 
-        stats = self.restricted.stats
+        stats = self.restricted['stats']
 
         for sensor in self.sensors:
             _sensor = sensor.replace('_collection', '')
-            if _sensor not in stats.sensors:
+            if _sensor not in stats['sensors']:
                 continue
             if self.validate_type_object(self.data_source[sensor]) and self.data_source[sensor]['products']:
-                if not set(stats.products) & set(self.data_source[sensor].products):
+                if not set(stats['products']) & set(self.data_source[sensor].products):
                     msg = "You must request valid products for statistics: {}"
-                    msg = msg.format(stats.products)
+                    msg = msg.format(list(stats['products']))
                     self._errors.append(msg)
             else:
                 msg = "Required field 'products' missing"
@@ -682,7 +676,8 @@ class ValidationProvider(object):
         was set to True
 
         :param order: incoming order after validation
-        :return: order with the inputs reformatted
+        :return: order with the inputs reformatted (a copy, the incoming
+                 order is left as it was)
         """
         prod_keys = sn.SensorCONST.instances.keys()
 
@@ -690,8 +685,10 @@ class ValidationProvider(object):
         if 'plot_statistics' in order and order['plot_statistics']:
             stats = True
 
+        order = dict(order)
         for key in order:
             if key in prod_keys:
+                order[key] = dict(order[key])
                 item1 = order[key]['inputs'][0]
 
                 prod = sn.instance(item1)
@@ -716,7 +713,7 @@ class ValidationProvider(object):
 
                 if stats:
                     if 'stats' not in order[key]['products']:
-                        order[key]['products'].append('stats')
+                        order[key]['products'] = order[key]['products'] + ['stats']
 
         return order
 
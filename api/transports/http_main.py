@@ -118,7 +118,8 @@ transport_api.add_resource(ProductionOperations,
                            '/production-api/v<version>/products',
                            '/production-api/v<version>/<action>',
                            '/production-api/v<version>/handle-orders',
-                           '/production-api/v<version>/queue-products')
+                           '/production-api/v<version>/queue-products',
+                           '/production-api/v<version>/update-products')
 
 transport_api.add_resource(ProductionStats,
                            '/production-api/v<version>/statistics/<name>',
@@ -93,6 +93,8 @@ class ProductionOperations(Resource):
         params = request.get_json(force=True)
         if 'queue-products' in request.url:
             resp = espa.queue_products(**params)
+        elif 'update-products' in request.url:
+            resp = espa.update_products(params)
         elif action:
             resp = espa.update_product_details(action, params)
 
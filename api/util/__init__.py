@@ -7,6 +7,7 @@ import datetime
 import json
 
 from . import connections
+from .julian import compile_restriction
 import six
 
 
@@ -149,8 +150,6 @@ def julian_date_check(julian_date, restrictions):
     :param restrictions: list/tuple of restrictions
     :return: True if it meets the restriction criteria
     """
-    valid_comp = '<>!'
-
     if not isinstance(julian_date, int):
         try:
             julian_date = int(julian_date)
@@ -158,45 +157,7 @@ def julian_date_check(julian_date, restrictions):
             raise ValueError('julian_date variable must be int or be '
                              'transformed to int')
 
-    if not isinstance(restrictions, tuple):
-        if isinstance(restrictions, list):
-            restrictions = tuple(restrictions)
-        elif isinstance(restrictions, six.string_types):
-            restrictions = restrictions,
-
-    for r in restrictions:
-        r = r.lstrip().rstrip()
-        if '|' in r:
-            s = False
-            for sub in r.split('|'):
-                if julian_date_check(julian_date, sub):
-                    s = True
-                    break
-
-            if not s:
-                return False
-            else:
-                continue
-
-        comp, lim = r.split()
-
-        if comp not in valid_comp:
-            raise ValueError('Comparison not implemented: {}'
-                             .format(comp))
-
-        if comp == '<':
-            if julian_date >= int(lim):
-                return False
-
-        elif comp == '>':
-            if julian_date <= int(lim):
-                return False
-
-        elif comp == '!':
-            if julian_date == int(lim):
-                return False
-
-    return True
+    return compile_restriction(restrictions).allows(julian_date)
 
 
 def cond_str(i):
@@ -4,10 +4,16 @@ import psycopg2
 import psycopg2.extras as db_extras
 import numbers
 import os
+import threading
+import time
 
 from collections import OrderedDict
+from contextlib import contextmanager
 from api.util import api_cfg
 
+# Seconds a caller will wait on an exhausted pool before giving up
+POOL_TIMEOUT = 30
+
 
 def dictfetchall(cursor, fetcharr):
     """ Returns all rows from a cursor as a dict """
@@ -20,42 +26,229 @@ class DBConnectException(Exception):
     pass
 
 
+def is_test_mode():
+    """
+    Check to see if we have set espa_api_testing, and if it is "True",
+    then we want to use the unit test schema and connection overrides
+    """
+    return os.environ.get('espa_api_testing') == 'True'
+
+
+def pool_size():
+    """
+    Number of connections each process is allowed to hold open
+
+    Defaults to one per uwsgi thread, plus a little headroom for the
+    thread pools used by the production provider.  Can be overridden
+    with ESPA_DB_POOL_SIZE.
+
+    :return: int
+    """
+    if os.environ.get('ESPA_DB_POOL_SIZE'):
+        return max(int(os.environ['ESPA_DB_POOL_SIZE']), 1)
+
+    threads = 1
+    try:
+        import uwsgi
+        threads = uwsgi.opt.get('threads', 1)
+        if isinstance(threads, bytes):
+            threads = threads.decode()
+        threads = int(threads)
+    except (ImportError, AttributeError, TypeError, ValueError):
+        pass
+
+    return max(threads, 1) + 4
+
+
+class ConnectionPool(object):
+    """
+    Thread-safe pool of psycopg2 connections, owned by a single process
+
+    Connections are opened on demand and kept open once handed back, so
+    later checkouts skip the connect and authentication round trips.
+    Checkouts block (up to POOL_TIMEOUT seconds) rather than fail outright
+    when every connection is in use, and the pool keeps simple counters
+    so its behavior can be inspected with pool_stats()
+    """
+    def __init__(self, maxconn, **conn_kwargs):
+        self.maxconn = maxconn
+        self.conn_kwargs = conn_kwargs
+        self._idle = []
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self.stats = {'checkouts': 0, 'in_use': 0, 'exhausted': 0,
+                      'wait_time': 0.0, 'max_wait_time': 0.0, 'discarded': 0,
+                      'opened': 0}
+
+    def getconn(self, timeout=POOL_TIMEOUT):
+        start = time.time()
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.stats['exhausted'] += 1
+            if not self._slots.acquire(timeout=timeout):
+                raise DBConnectException('Connection pool exhausted, waited '
+                                         '{} seconds'.format(timeout))
+        waited = time.time() - start
+
+        try:
+            conn = self._take_idle()
+            if conn is None:
+                conn = psycopg2.connect(**self.conn_kwargs)
+                with self._lock:
+                    self.stats['opened'] += 1
+            if is_test_mode():
+                self._set_test_schema(conn)
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self.stats['checkouts'] += 1
+            self.stats['in_use'] += 1
+            self.stats['wait_time'] += waited
+            self.stats['max_wait_time'] = max(self.stats['max_wait_time'],
+                                              waited)
+        return conn
+
+    def _take_idle(self):
+        """ Most recently returned open connection, if there is one """
+        with self._lock:
+            while self._idle:
+                conn = self._idle.pop()
+                if not conn.closed:
+                    return conn
+                self.stats['discarded'] += 1
+        return None
+
+    def putconn(self, conn):
+        """
+        Reset the connection state before handing it back, anything left
+        uncommitted by the borrower is rolled back
+        """
+        discard = bool(conn.closed)
+        if not discard:
+            try:
+                conn.rollback()
+                if conn.autocommit:
+                    conn.autocommit = False
+            except psycopg2.Error:
+                discard = True
+
+        try:
+            if discard:
+                self._close(conn)
+            else:
+                with self._lock:
+                    self._idle.append(conn)
+        finally:
+            self._slots.release()
+            with self._lock:
+                self.stats['in_use'] -= 1
+                if discard:
+                    self.stats['discarded'] += 1
+
+    def closeall(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._close(conn)
+
+    @staticmethod
+    def _close(conn):
+        try:
+            if not conn.closed:
+                conn.close()
+        except psycopg2.Error:
+            pass
+
+    @staticmethod
+    def _set_test_schema(conn):
+        # psycopg2 doesn't allow you to specify a schema when connecting to the database.
+        # by modifying search_path for the connection, we can ensure were only working with
+        # tables in the espa_unit_testing schema
+        # Committed so it survives the rollback done when the connection is returned
+        with conn.cursor() as cursor:
+            cursor.execute("set search_path = espa_unit_test;")
+        conn.commit()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(dbhost, db, dbuser, dbpass, dbport):
+    """
+    Retrieve the connection pool for the current process, pools are
+    keyed on the pid so forked uwsgi workers never share sockets
+
+    :return: ConnectionPool
+    """
+    key = (os.getpid(), dbhost, db, dbuser, str(dbport))
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                # drop anything inherited from a parent process
+                for k in [k for k in _pools if k[0] != key[0]]:
+                    del _pools[k]
+                pool = ConnectionPool(pool_size(), host=dbhost, database=db,
+                                      user=dbuser, password=dbpass,
+                                      port=dbport)
+                _pools[key] = pool
+    return pool
+
+
+def pool_stats():
+    """
+    Checkout, wait time and exhaustion counters for the pools
+    held by the current process
+
+    :return: list of dicts
+    """
+    pid = os.getpid()
+    with _pools_lock:
+        pools = [(k, p) for k, p in _pools.items() if k[0] == pid]
+
+    results = []
+    for key, pool in pools:
+        with pool._lock:
+            stats = dict(pool.stats)
+        stats.update({'host': key[1], 'db': key[2], 'maxconn': pool.maxconn})
+        results.append(stats)
+    return results
+
+
 class DBConnect(object):
     """
     Class for connecting to a postgresql database using a single with statement
+
+    Connections are borrowed from a per-process pool and handed back
+    (rolled back) when the with block exits
     """
     def __init__(self, dbhost, db, dbuser, dbpass, dbport, autocommit=False,
                  cursor_factory=db_extras.DictCursor):
-        test_mode = False
-        # Check to see if we have set this value, and if it is "True",
-        # then we want to use specific environment variables
-        # to connect our unit tests to the proper DB
-        if 'espa_api_testing' in list(os.environ.keys()):
-            if os.environ["espa_api_testing"] == "True":
-                test_mode = True
-
-        if test_mode:
+        # use specific environment variables to connect
+        # our unit tests to the proper DB
+        if is_test_mode():
             keys = list(os.environ.keys())
             if 'ESPA_PG_TEST_HOST' in keys and 'ESPA_PG_TEST_PORT' in keys:
                 dbhost = os.environ["ESPA_PG_TEST_HOST"]
                 dbport = os.environ["ESPA_PG_TEST_PORT"]
 
+        self.conn = None
+        self.cursor = None
+        self.pool = get_pool(dbhost, db, dbuser, dbpass, dbport)
         try:
-            self.conn = psycopg2.connect(host=dbhost, database=db, user=dbuser,
-                                         password=dbpass, port=dbport)
+            self.conn = self.pool.getconn()
             self.cursor = self.conn.cursor(cursor_factory=cursor_factory)
         except psycopg2.Error as e:
+            self.close()
             raise DBConnectException(e)
 
         self.autocommit = autocommit
         self.fetcharr = []
 
-        # psycopg2 doesn't allow you to specify a schema when connecting to the database.
-        # by modifying search_path for the connection, we can ensure were only working with
-        # tables in the espa_unit_testing schema
-        if test_mode:
-            self.cursor.execute("set search_path = espa_unit_test;")
-
     def execute(self, sql_str, params=None):
         """
         Used for enacting some change on a database
@@ -102,6 +295,21 @@ class DBConnect(object):
     def rollback(self):
         self.conn.rollback()
 
+    def close(self):
+        """
+        Close the cursor and return the connection to the pool
+        """
+        cursor, conn = self.cursor, self.conn
+        self.cursor, self.conn = None, None
+        try:
+            if cursor is not None and not cursor.closed:
+                cursor.close()
+        except psycopg2.Error as e:
+            raise DBConnectException(e)
+        finally:
+            if conn is not None:
+                self.pool.putconn(conn)
+
     @staticmethod
     def conv_totuple(val):
         """
@@ -132,11 +340,7 @@ class DBConnect(object):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        try:
-            self.cursor.close()
-            self.conn.close()
-        except psycopg2.Error as e:
-            raise DBConnectException(e)
+        self.close()
 
     def __len__(self):
         return len(self.fetcharr)
@@ -152,15 +356,139 @@ class DBConnect(object):
 
     def __del__(self):
         try:
-            self.cursor.close()
-            self.conn.close()
-
-            del self.cursor
-            del self.conn
+            if getattr(self, 'conn', None) is not None:
+                self.close()
         except Exception as e:
             raise DBConnectException(e)
 
 
+class UnitConnect(DBConnect):
+    """
+    DBConnect handed out by db_instance() while a unit_of_work is active
+
+    Shares the unit's connection, so commit() is deferred until the unit
+    completes and exiting the with block only closes the cursor
+    """
+    def __init__(self, unit, cursor_factory=db_extras.DictCursor):
+        self.unit = unit
+        self.pool = unit.db.pool
+        self.conn = unit.db.conn
+        self.autocommit = False
+        self.fetcharr = []
+        try:
+            self.cursor = self.conn.cursor(cursor_factory=cursor_factory)
+        except psycopg2.Error as e:
+            self.cursor = None
+            raise DBConnectException(e)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self.unit.rollback_only = True
+
+    def close(self):
+        cursor, self.cursor, self.conn = self.cursor, None, None
+        try:
+            if cursor is not None and not cursor.closed:
+                cursor.close()
+        except psycopg2.Error as e:
+            raise DBConnectException(e)
+
+
+class UnitOfWork(object):
+    """
+    A single transaction shared by every db_instance() made on the
+    current thread, committed once when the outermost unit exits
+    """
+    def __init__(self):
+        self.db = DBConnect(**api_cfg('db'))
+        self.rollback_only = False
+        self.savepoints = 0
+
+    @contextmanager
+    def savepoint(self):
+        """
+        Nested scope which can fail and be rolled back on its own,
+        without discarding the rest of the unit's work
+        """
+        self.savepoints += 1
+        name = 'uow_{}'.format(self.savepoints)
+        self.db.execute('SAVEPOINT {}'.format(name))
+        try:
+            yield self
+        except BaseException:
+            try:
+                self.db.execute('ROLLBACK TO SAVEPOINT {}'.format(name))
+            except DBConnectException:
+                # connection is unusable, the whole unit will roll back
+                self.rollback_only = True
+            raise
+        else:
+            self.db.execute('RELEASE SAVEPOINT {}'.format(name))
+
+    def finish(self, success):
+        try:
+            if success and not self.rollback_only:
+                self.db.commit()
+            else:
+                self.db.rollback()
+        finally:
+            self.db.close()
+
+
+_local = threading.local()
+
+
+def current_unit():
+    """
+    The unit_of_work active on this thread, if any
+
+    :return: UnitOfWork or None
+    """
+    return getattr(_local, 'unit', None)
+
+
+@contextmanager
+def unit_of_work():
+    """
+    Group every database operation made on this thread into one
+    transaction, committed when the with block exits cleanly and
+    rolled back if it raises
+
+    Nested units become savepoints, so an inner block can fail
+    (and be caught) without losing the outer work:
+
+        with unit_of_work():
+            for order in orders:
+                try:
+                    with unit_of_work():
+                        order.update('status', 'purged')
+                except OrderException:
+                    pass
+
+    :return: UnitOfWork
+    """
+    unit = current_unit()
+    if unit is not None:
+        with unit.savepoint():
+            yield unit
+        return
+
+    unit = UnitOfWork()
+    _local.unit = unit
+    success = False
+    try:
+        yield unit
+        success = True
+    finally:
+        _local.unit = None
+        unit.finish(success)
+
+
 def db_instance():
+    unit = current_unit()
+    if unit is not None:
+        return UnitConnect(unit)
     return DBConnect(**api_cfg('db'))
 
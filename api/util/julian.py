@@ -0,0 +1,158 @@
+"""
+Purpose: compiled julian date restrictions, as used in restricted.yaml
+
+A restriction is a list of clauses which must all hold, each clause being
+one or more comparisons joined by '|' of which any one must hold:
+
+    ['< 2016151 | > 2016164', '< 2017071 | > 2017076']
+
+Supported comparisons are '<', '>' and '!' (not equal).  Restrictions are
+compiled once into the sorted, disjoint set of julian date intervals they
+allow, so checking a date is a binary search, and checking many dates can
+be done in one vectorized pass when NumPy is installed
+"""
+import bisect
+from functools import lru_cache
+
+import six
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+INF = float('inf')
+
+# Distinct restrictions compiled and kept by each process
+COMPILE_CACHE_SIZE = 256
+
+
+class DateRestriction(object):
+    """
+    The julian dates allowed by a restriction, as half-open [start, end)
+    intervals over the integers
+    """
+    __slots__ = ('starts', 'ends', '_starts', '_ends')
+
+    def __init__(self, intervals):
+        self.starts = tuple(s for s, _ in intervals)
+        self.ends = tuple(e for _, e in intervals)
+        if numpy is not None:
+            self._starts = numpy.array(self.starts, dtype=float)
+            self._ends = numpy.array(self.ends, dtype=float)
+
+    def __repr__(self):
+        return 'DateRestriction: {}'.format(list(zip(self.starts, self.ends)))
+
+    def allows(self, julian_date):
+        """
+        Check a single julian date
+
+        :param julian_date: julian date as int, or a str of one (2016151)
+        :return: True if it meets the restriction criteria
+        """
+        julian_date = _to_int(julian_date)
+        i = bisect.bisect_right(self.starts, julian_date) - 1
+        return i >= 0 and julian_date < self.ends[i]
+
+    def mask(self, julian_dates):
+        """
+        Check many julian dates at once
+
+        :param julian_dates: iterable (or NumPy array) of julian dates
+        :return: booleans, True where the date meets the restriction
+                 criteria, as a NumPy array when NumPy is available
+        """
+        if numpy is None or not self.starts:
+            return [self.allows(j) for j in julian_dates]
+
+        try:
+            dates = numpy.asarray(julian_dates, dtype=numpy.int64)
+        except (TypeError, ValueError):
+            raise ValueError('julian_dates must be ints or be '
+                             'transformed to ints')
+
+        i = numpy.searchsorted(self._starts, dates, side='right') - 1
+        # dates before the first interval have i == -1, which wraps
+        # around to the last interval, so are excluded by i >= 0
+        return (i >= 0) & (dates < self._ends[i])
+
+
+def _to_int(julian_date):
+    if isinstance(julian_date, int):
+        return julian_date
+    try:
+        return int(julian_date)
+    except (TypeError, ValueError):
+        raise ValueError('julian_date variable must be int or be '
+                         'transformed to int')
+
+
+def _comparison(condition):
+    """ Intervals allowed by one comparison, e.g. '< 2016151' """
+    try:
+        comp, lim = condition.split()
+        lim = int(lim)
+    except ValueError:
+        raise ValueError('Invalid date restriction: {}'.format(condition))
+
+    if comp == '<':
+        return [(-INF, lim)]
+    elif comp == '>':
+        return [(lim + 1, INF)]
+    elif comp == '!':
+        return [(-INF, lim), (lim + 1, INF)]
+    raise ValueError('Comparison not implemented: {}'.format(comp))
+
+
+def _union(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _intersect(left, right):
+    out = []
+    i = j = 0
+    while i < len(left) and j < len(right):
+        start = max(left[i][0], right[j][0])
+        end = min(left[i][1], right[j][1])
+        if start < end:
+            out.append((start, end))
+        if left[i][1] < right[j][1]:
+            i += 1
+        else:
+            j += 1
+    return out
+
+
+@lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def _compile(clauses):
+    allowed = [(-INF, INF)]
+    for clause in clauses:
+        either = []
+        for condition in clause.split('|'):
+            either.extend(_comparison(condition.strip()))
+        allowed = _intersect(allowed, _union(either))
+    return DateRestriction(allowed)
+
+
+def compile_restriction(restrictions):
+    """
+    Compile (or fetch the already compiled) restriction
+
+    >>> r = compile_restriction(['< 2015305 | > 2015307', '< 2015365'])
+    >>> r.allows(2015306), r.allows('2015308'), r.allows(2015365)
+    (False, True, False)
+
+    :param restrictions: list/tuple of restrictions, or a single one
+    :return: DateRestriction
+    """
+    if isinstance(restrictions, six.string_types):
+        restrictions = restrictions,
+    return _compile(tuple(r.strip() for r in restrictions))
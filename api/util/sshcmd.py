@@ -3,11 +3,24 @@ Purpose: Easy access to run remote ssh commands.
 Original Author: David V. Hill
 '''
 
+import os
+import socket
+import threading
+
 import paramiko
 from api.system.logger import ilogger as logger
 
+# Seconds between keepalive packets on an idle connection
+KEEPALIVE = 30
+
 
 class RemoteHost(object):
+    """
+    Runs commands on a remote host over a single authenticated SSH
+    connection, which is kept open between commands.  Each command gets
+    its own channel on that connection, and a dropped connection is
+    re-established (once) before giving up on a command
+    """
     client = None
 
     def __init__(self, host, user, pw=None, debug=False, timeout=None):
@@ -17,43 +30,71 @@ class RemoteHost(object):
         self.pw = pw
         self.debug = debug
         self.timeout = timeout
+        self._lock = threading.Lock()
 
-    def execute(self, command):
-        """ """
-        try:
-            if self.debug is True:
-                logger.critical("Attempting to run [%s] on %s as %s" %
-                                (command,  self.host, self.user))
+    @property
+    def connected(self):
+        if self.client is None:
+            return False
+        transport = self.client.get_transport()
+        return transport is not None and transport.is_active()
 
-            self.client = paramiko.SSHClient()
-            self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    def connect(self):
+        """ Open the connection, unless it is already up """
+        if self.connected:
+            return self.client
+
+        with self._lock:
+            if self.connected:
+                return self.client
+            self.close()
+
+            client = paramiko.SSHClient()
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
 
             if self.pw is not None:
-                self.client.connect(self.host,
-                                    username=self.user,
-                                    password=self.pw,
-                                    timeout=self.timeout)
+                client.connect(self.host,
+                               username=self.user,
+                               password=self.pw,
+                               timeout=self.timeout)
             else:
-                self.client.connect(self.host,
-                                    username=self.user,
-                                    timeout=self.timeout)
+                client.connect(self.host,
+                               username=self.user,
+                               timeout=self.timeout)
+
+            client.get_transport().set_keepalive(KEEPALIVE)
+            self.client = client
+            return client
+
+    def close(self):
+        client, self.client = self.client, None
+        if client is not None:
+            client.close()
 
-            stdin, stdout, stderr = self.client.exec_command(command)
-            stdin.close()
+    def execute(self, command):
+        """ """
+        if self.debug is True:
+            logger.critical("Attempting to run [%s] on %s as %s" %
+                            (command,  self.host, self.user))
 
-            return {'stdout': stdout.readlines(), 'stderr': stderr.readlines()}
+        for attempt in (1, 2):
+            try:
+                stdin, stdout, stderr = self.connect().exec_command(command)
+                stdin.close()
 
-        except paramiko.SSHException as e:
-            logger.critical('Failed running [{}]'
-                            ' on {} as {} exception: {}'
-                            .format(command, self.host, self.user, e))
+                return {'stdout': stdout.readlines(), 'stderr': stderr.readlines()}
 
-            return e
+            except (paramiko.SSHException, EOFError, socket.error) as e:
+                # the connection may have dropped since it was last used
+                self.close()
+                if attempt == 1 and not isinstance(e, paramiko.AuthenticationException):
+                    continue
 
-        finally:
-            if self.client is not None:
-                self.client.close()
-                self.client = None
+                logger.critical('Failed running [{}]'
+                                ' on {} as {} exception: {}'
+                                .format(command, self.host, self.user, e))
+
+                return e
 
     def execute_script(self, script, interpreter):
         raise NotImplementedError
@@ -63,3 +104,29 @@ class RemoteHost(object):
 
     def get(self, remotepath, localpath, mkdirs=True):
         raise NotImplementedError
+
+
+_hosts = {}
+_hosts_lock = threading.Lock()
+
+
+def get_host(host, user, pw=None, timeout=None):
+    """
+    Retrieve the RemoteHost shared by the current process, hosts are
+    keyed on the pid so forked uwsgi workers never share a connection
+
+    :return: RemoteHost
+    """
+    key = (os.getpid(), host, user, pw)
+    remote = _hosts.get(key)
+    if remote is None:
+        with _hosts_lock:
+            remote = _hosts.get(key)
+            if remote is None:
+                # drop anything inherited from a parent process, without
+                # closing the parent's connection
+                for k in [k for k in _hosts if k[0] != key[0]]:
+                    del _hosts[k]
+                remote = RemoteHost(host, user, pw, timeout=timeout)
+                _hosts[key] = remote
+    return remote
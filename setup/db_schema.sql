@@ -66,6 +66,41 @@ BEGIN
 END;
 $$;
 
+--
+-- Name: bump_configuration_version(); Type: FUNCTION; Schema: espadev; Owner: espadev
+--
+
+CREATE FUNCTION bump_configuration_version() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+    UPDATE ordering_configuration_version SET version = version + 1;
+    RETURN NULL;
+END;
+$$;
+
+--
+-- Name: ordering_configuration_version; Type: TABLE; Schema: espadev; Owner: espadev
+--
+
+CREATE TABLE ordering_configuration_version (
+    version bigint DEFAULT 0 NOT NULL
+);
+
+INSERT INTO ordering_configuration_version (version) VALUES (0);
+
+--
+-- Name: ordering_entity_catalog; Type: TABLE; Schema: espadev; Owner: espadev
+--
+
+CREATE TABLE ordering_entity_catalog (
+    dataset character varying(255) NOT NULL,
+    display_id character varying(255) NOT NULL,
+    entity_id character varying(255) NOT NULL,
+    created timestamp without time zone DEFAULT now() NOT NULL,
+    PRIMARY KEY (dataset, display_id)
+);
+
 
 --
 -- Name: auth_group_id_seq; Type: SEQUENCE; Schema: espadev; Owner: espadev
@@ -880,6 +915,13 @@ CREATE INDEX trans_etl_layer_trigger_read ON trans_etl_layer USING btree (trigge
 CREATE TRIGGER update_status_modtime BEFORE UPDATE ON ordering_scene FOR EACH ROW EXECUTE PROCEDURE update_modified_column();
 
 
+--
+-- Name: ordering_configuration bump_configuration_version; Type: TRIGGER; Schema: espadev; Owner: espadev
+--
+
+CREATE TRIGGER bump_configuration_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON ordering_configuration FOR EACH STATEMENT EXECUTE PROCEDURE bump_configuration_version();
+
+
 --
 -- Name: auth_group_permissions_group_id_fkey; Type: FK CONSTRAINT; Schema: espadev; Owner: espadev
 --
@@ -45,6 +45,7 @@ INSERT INTO ordering_configuration (key, value) VALUES
 
 -- api.external.onlinecache
     ('online_cache_orders_dir', '/path/2/output'),
+    ('online_cache_backend', 'ssh'),
 
     ('ladsftp.password', 'dummy_password'),
     ('ladsftp.username', 'dummy_username'),
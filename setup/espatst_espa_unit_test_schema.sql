@@ -12,6 +12,41 @@ SET client_min_messages = warning;
 
 SET search_path = espa_unit_test;
 
+--
+-- Name: bump_configuration_version(); Type: FUNCTION; Schema: espa_unit_test; Owner: espatst
+--
+
+CREATE FUNCTION bump_configuration_version() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+    UPDATE ordering_configuration_version SET version = version + 1;
+    RETURN NULL;
+END;
+$$;
+
+--
+-- Name: ordering_configuration_version; Type: TABLE; Schema: espa_unit_test; Owner: espatst
+--
+
+CREATE TABLE ordering_configuration_version (
+    version bigint DEFAULT 0 NOT NULL
+);
+
+INSERT INTO ordering_configuration_version (version) VALUES (0);
+
+--
+-- Name: ordering_entity_catalog; Type: TABLE; Schema: espa_unit_test; Owner: espatst
+--
+
+CREATE TABLE ordering_entity_catalog (
+    dataset character varying(255) NOT NULL,
+    display_id character varying(255) NOT NULL,
+    entity_id character varying(255) NOT NULL,
+    created timestamp without time zone DEFAULT now() NOT NULL,
+    PRIMARY KEY (dataset, display_id)
+);
+
 --
 -- Name: auth_group_id_seq; Type: SEQUENCE; Schema: espa_unit_test; Owner: espatst
 --
@@ -653,6 +688,13 @@ CREATE UNIQUE INDEX auth_user_username ON auth_user USING btree (username);
 CREATE UNIQUE INDEX ordering_configuration_key ON ordering_configuration USING btree (key);
 
 
+--
+-- Name: ordering_configuration bump_configuration_version; Type: TRIGGER; Schema: espa_unit_test; Owner: espatst
+--
+
+CREATE TRIGGER bump_configuration_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON ordering_configuration FOR EACH STATEMENT EXECUTE PROCEDURE bump_configuration_version();
+
+
 --
 -- Name: ordering_order_completion_date; Type: INDEX; Schema: espa_unit_test; Owner: espatst; Tablespace: 
 --
@@ -1,7 +1,11 @@
 import unittest
 import os
 
+from mock import patch
+
 from api.interfaces.admin import version1
+from api.providers.configuration.configuration_provider import ConfigurationProvider
+from api.util.dbconnect import db_instance
 
 espa = version1.API()
 
@@ -67,3 +71,20 @@ class TestAdminConfiguration(unittest.TestCase):
 
         resp = espa.access_configuration(key=self.test_key, delete=True)
         self.assertIsNone(resp)
+
+    def test_config_snapshot_picks_up_external_changes(self):
+        cfg = ConfigurationProvider()
+        cfg.put(self.test_key, self.test_value)
+
+        # simulate another worker changing the value
+        with db_instance() as db:
+            db.execute('update ordering_configuration set value = %s '
+                       'where key = %s', ('changed', self.test_key))
+            db.commit()
+
+        self.assertEqual(cfg.get(self.test_key), self.test_value)
+        with patch('api.providers.configuration.configuration_provider.CONFIG_TTL', 0):
+            self.assertEqual(cfg.get(self.test_key), 'changed')
+
+        cfg.delete(self.test_key)
+        self.assertIsNone(cfg.get(self.test_key))
@@ -9,6 +9,7 @@ from api.util import lowercase_all
 from test.invalid_orders import InvalidOrders
 from test import version0_testorders as testorders
 from api.providers.validation.validation_schema import BaseValidationSchema
+from api.providers.validation.compiled import compiled
 from api import ValidationException, InventoryException, OpenSceneLimitException, __location__
 
 import os
@@ -21,7 +22,8 @@ from api.providers.production.mocks.production_provider import MockProductionPro
 from api.providers.production.production_provider import ProductionProvider
 from api.providers.ordering.ordering_provider import OrderingProvider
 from api.system.logger import ilogger as logger
-from mock import patch
+from api.util.dbconnect import db_instance, pool_stats, unit_of_work, ConnectionPool, DBConnectException
+from mock import patch, MagicMock
 
 api = APIv1()
 production_provider = ProductionProvider()
@@ -89,6 +91,14 @@ class TestAPI(unittest.TestCase):
         for item in self.restricted['all']['role']:
             self.assertFalse(item in return_dict[self.staff_sensor]['products'])
 
+    def test_get_available_products_date_restricted(self):
+        # etm7 SR is unavailable between 2016151 and 2016164
+        restricted_id = 'LE07_L1TP_026027_20160605_20171008_01_T1'
+        return_dict = api.available_products([self.staff_product_id, restricted_id],
+                                             self.user.username)
+        self.assertNotIn('sr', return_dict[self.staff_sensor]['products'])
+        self.assertEqual(return_dict['date_restricted']['sr'], [restricted_id])
+
     def test_fetch_user_orders_by_email_val(self):
         orders = api.fetch_user_orders(email=self.user.email)
         self.assertTrue(len(orders) > 1)
@@ -116,6 +126,28 @@ class TestAPI(unittest.TestCase):
         self.assertEqual(set([s.name for s in self.order.scenes()]),
                          set([s.name for s in response[self.order.orderid]]))
 
+    def test_user_queries_are_read_only(self):
+        sql = 'update auth_user set last_login = %s where id = %s'
+        with db_instance() as db:
+            db.execute(sql, ('2000-01-01', self.user.id))
+            db.commit()
+
+        user = User.by_username(self.user.username)
+        self.assertEqual(user.id, self.user.id)
+        User.find(self.user.id)
+
+        with db_instance() as db:
+            db.select('select last_login from auth_user where id = %s', self.user.id)
+            self.assertEqual(db[0]['last_login'].year, 2000)
+
+    def test_user_roles_loaded_with_user(self):
+        user = User.by_username(self.user.username)
+        self.assertEqual(user.role_list(), ['active'])
+
+        user.update('is_staff', True)
+        self.assertTrue(user.is_staff())
+        self.assertTrue(User.find(user.id).is_staff())
+
 
 class TestValidation(unittest.TestCase):
     def setUp(self):
@@ -642,6 +674,25 @@ class TestValidation(unittest.TestCase):
                                          "Aquatic Reflectance currently only available for Landsat 8 OLI or OLI/TIRS"):
                 api.validation.validate(iorder, self.staffuser.username)
 
+    def test_fast_item_checks_match_jsonschema(self):
+        """
+        The precompiled inputs/products item checks should report the same
+        errors as jsonschema does for the full request schema
+        """
+        order = copy.deepcopy(self.base_order)
+        sensors = [k for k in order if isinstance(order[k], dict) and 'inputs' in order[k]]
+        for key in sensors[:2]:
+            order[key]['inputs'].extend([5, None, 'bogus'])
+            order[key]['products'].extend([3, 'nope', ['sr']])
+
+        def errors(fast):
+            schema = compiled(self.base_schema, fast=fast)
+            return sorted((list(e.path), e.validator, e.message) for e in schema.iter_errors(order))
+
+        fast_errors = errors(True)
+        self.assertTrue(fast_errors)
+        self.assertEqual(errors(False), fast_errors)
+
 
 class TestInventory(unittest.TestCase):
     def setUp(self):
@@ -695,3 +746,88 @@ class TestInventory(unittest.TestCase):
         """
         with self.assertRaises(InventoryException):
             api.inventory.check(self.lpdaac_order_bad)
+
+
+class TestDBConnect(unittest.TestCase):
+    def setUp(self):
+        os.environ['espa_api_testing'] = 'True'
+
+    def tearDown(self):
+        os.environ['espa_api_testing'] = ''
+
+    def test_pool_reuses_connection(self):
+        with db_instance() as db:
+            conn = db.conn
+        with db_instance() as db:
+            self.assertIs(conn, db.conn)
+
+        stats = pool_stats()[0]
+        self.assertEqual(stats['in_use'], 0)
+        self.assertGreaterEqual(stats['checkouts'], 2)
+
+    @patch('api.util.dbconnect.psycopg2.connect')
+    def test_pool_keeps_returned_connections_open(self, mock_connect):
+        mock_connect.side_effect = lambda **kw: MagicMock(closed=0, autocommit=False)
+        pool = ConnectionPool(2)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        self.assertIs(pool.getconn(), conn)
+        self.assertFalse(conn.close.called)
+        self.assertEqual(mock_connect.call_count, 1)
+
+    def test_pool_rolls_back_on_return(self):
+        with db_instance() as db:
+            db.execute("insert into ordering_configuration (key, value) "
+                       "values ('system.pool_test', 'uncommitted')")
+        with db_instance() as db:
+            db.select("select value from ordering_configuration "
+                      "where key = 'system.pool_test'")
+            self.assertEqual(len(db), 0)
+            db.select("show search_path")
+            self.assertEqual(db[0][0], 'espa_unit_test')
+
+    def test_unit_of_work_savepoint(self):
+        insert = ("insert into ordering_configuration (key, value) "
+                  "values (%s, 'uow')")
+        with unit_of_work():
+            with db_instance() as db:
+                db.execute(insert, ('system.uow_outer',))
+                db.commit()
+            with self.assertRaises(ValueError):
+                with unit_of_work():
+                    with db_instance() as db:
+                        db.execute(insert, ('system.uow_inner',))
+                    raise ValueError
+            # a failed statement aborts the transaction, until the
+            # savepoint is rolled back
+            with self.assertRaises(DBConnectException):
+                with unit_of_work():
+                    with db_instance() as db:
+                        db.execute(insert, ('system.uow_outer',))
+            with db_instance() as db:
+                db.execute(insert, ('system.uow_after',))
+
+        with db_instance() as db:
+            db.select("select key from ordering_configuration "
+                      "where key like 'system.uow_%%' order by key")
+            keys = [r[0] for r in db]
+            db.execute("delete from ordering_configuration "
+                       "where key like 'system.uow_%%'")
+            db.commit()
+        self.assertEqual(keys, ['system.uow_after', 'system.uow_outer'])
+
+    @patch('api.util.dbconnect.api_cfg', lambda section: {})
+    @patch('api.util.dbconnect.DBConnect')
+    def test_unit_of_work_nested_failure_rolls_back_to_savepoint(self, mock_db):
+        db = mock_db.return_value
+        with unit_of_work():
+            try:
+                with unit_of_work():
+                    raise ValueError
+            except ValueError:
+                pass
+
+        statements = [c[0][0] for c in db.execute.call_args_list]
+        self.assertEqual(statements, ['SAVEPOINT uow_1', 'ROLLBACK TO SAVEPOINT uow_1'])
+        self.assertTrue(db.commit.called)
+        self.assertFalse(db.rollback.called)
@@ -1,4 +1,6 @@
 import os
+import shutil
+import tempfile
 import unittest
 from mock import patch, MagicMock
 
@@ -32,32 +34,32 @@ class TestInventory(unittest.TestCase):
     def tearDown(self):
         os.environ['espa_api_testing'] = ''
 
-    @patch('api.external.inventory.requests.get', mockinventory.RequestsSpoof)
-    @patch('api.external.inventory.requests.post', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.get', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.post', mockinventory.RequestsSpoof)
     def test_api_login(self):
         token = inventory.get_session()
         self.assertIsInstance(token, str)
         self.assertTrue(inventory.logout(token))
 
-    @patch('api.external.inventory.requests.head', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.head', mockinventory.RequestsSpoof)
     def test_api_available(self):
         self.assertTrue(inventory.available())
 
-    @patch('api.external.inventory.requests.get', mockinventory.RequestsSpoof)
-    @patch('api.external.inventory.requests.post', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.get', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.post', mockinventory.RequestsSpoof)
     def test_api_id_lookup(self):
         entity_ids = inventory.convert(self.token, ['LC08_L1TP_156063_20170207_20170216_01_T1'], 'LANDSAT_8_C1')
         self.assertEqual({'LC08_L1TP_156063_20170207_20170216_01_T1'}, set(entity_ids))
 
-    @patch('api.external.inventory.requests.get', mockinventory.RequestsSpoof)
-    @patch('api.external.inventory.requests.post', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.get', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.post', mockinventory.RequestsSpoof)
     def test_api_validation(self):
         results = inventory.verify_scenes(self.token, ['LC08_L1TP_156063_20170207_20170216_01_T1'], 'LANDSAT_8_C1')
         test = {'LC08_L1TP_156063_20170207_20170216_01_T1': True}
         self.assertDictEqual(test, results)
 
-    @patch('api.external.inventory.requests.get', mockinventory.RequestsSpoof)
-    @patch('api.external.inventory.requests.post', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.get', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.post', mockinventory.RequestsSpoof)
     def test_api_get_download_urls(self):
         entity_ids = inventory.convert(self.token, ['LC08_L1TP_156063_20170207_20170216_01_T1'], 'LANDSAT_8_C1')
         results = inventory.get_download_urls(self.token, ['LC08_L1TP_156063_20170207_20170216_01_T1'], 'LANDSAT_8_C1')
@@ -69,20 +71,52 @@ class TestInventory(unittest.TestCase):
         for pid in entity_ids.values():
             self.assertRegexpMatches(results.get(pid), ip_address_host_regex)
 
-    @patch('api.external.inventory.requests.get', mockinventory.RequestsSpoof)
-    @patch('api.external.inventory.requests.post', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.get', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.post', mockinventory.RequestsSpoof)
     def test_clear_user_context(self):
         success = inventory.clear_user_context(self.token)
         self.assertTrue(success)
 
+    @patch('api.external.inventory.requests.Session.post', mockinventory.CachedRequestPreventionSpoof)
+    def test_convert_uses_entity_catalog(self):
+        pid = 'LC08_L1TP_156063_20170207_20170216_01_T1'
+        inventory.catalog._remember('LANDSAT_8_C1', {pid: 'LC81560632017038LGN00'})
+        try:
+            entity_ids = inventory.convert(self.token, [pid], 'LANDSAT_8_C1')
+        finally:
+            inventory.catalog.clear()
+        self.assertEqual(entity_ids, {pid: 'LC81560632017038LGN00'})
+
+    def test_split_by_dataset(self):
+        ids = ['LO08_L1TP_042034_20011103_20160706_01_T1'] + self.collection_ids
+        results = inventory.split_by_dataset(ids)
+        self.assertEqual(results['LANDSAT_8_C1'], [ids[0], ids[1]])
+        self.assertEqual(results['LANDSAT_ETM_C1'], [ids[2]])
+        self.assertEqual(results['LANDSAT_TM_C1'], [ids[3]])
+
+    @patch('api.external.inventory.CHUNK_SIZE', 2)
+    def test_check_valid_chunks_by_dataset(self):
+        calls = []
+
+        def verify(token, ids, dataset):
+            calls.append((dataset, tuple(ids)))
+            return {i: True for i in ids}
+
+        with patch('api.external.inventory.verify_scenes', verify):
+            results = inventory.check_valid(self.token, self.collection_ids * 2)
+
+        self.assertEqual(set(results), set(self.collection_ids))
+        self.assertTrue(all(len(ids) <= 2 for _, ids in calls))
+        self.assertEqual(len({d for d, _ in calls}), 3)
+
 
 class TestCachedInventory(unittest.TestCase):
     """
     Provide testing for the CACHED EarthExplorer JSON API
         (FIXME: this still requires an active memcached session)
     """
-    @patch('api.external.inventory.requests.get', mockinventory.RequestsSpoof)
-    @patch('api.external.inventory.requests.post', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.get', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.post', mockinventory.RequestsSpoof)
     def setUp(self):
         os.environ['espa_api_testing'] = 'True'
         self.token = inventory.get_cached_session()  # Initial "real" request
@@ -95,7 +129,7 @@ class TestCachedInventory(unittest.TestCase):
     def tearDown(self):
         os.environ['espa_api_testing'] = ''
 
-    @patch('api.external.inventory.requests.post', mockinventory.CachedRequestPreventionSpoof)
+    @patch('api.external.inventory.requests.Session.post', mockinventory.CachedRequestPreventionSpoof)
     def test_cached_login(self):
         token = inventory.get_cached_session()
         self.assertIsInstance(token, str)
@@ -133,4 +167,39 @@ class TestOnlineCache(unittest.TestCase):
         results = self.cache.delete('bilbo')
         self.assertTrue(results)
 
+    @patch('api.external.onlinecache.OnlineCache.execute_command', mockonlinecache.delete_many)
+    def test_cache_delete_many(self):
+        results = self.cache.delete_many(['bilbo', 'frodo', '../samwise'])
+        self.assertEqual(results, {'bilbo': 'deleted', 'frodo': 'deleted',
+                                   '../samwise': 'failed'})
+
+
+class TestLocalOnlineCache(unittest.TestCase):
+    """
+    Tests for the distribution cache when it is mounted locally
+    """
+    def setUp(self):
+        self.orderpath = tempfile.mkdtemp()
+        for orderid in ('bilbo', 'frodo'):
+            os.makedirs(os.path.join(self.orderpath, orderid, 'sub'))
+        settings = {'online_cache_orders_dir': self.orderpath,
+                    'online_cache_backend': 'local'}
+        with patch.object(onlinecache.OnlineCache.config, 'get', settings.get):
+            self.cache = onlinecache.cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.orderpath, ignore_errors=True)
+
+    def test_local_cache_listorders(self):
+        self.assertIsInstance(self.cache, onlinecache.LocalOnlineCache)
+        self.assertEqual(self.cache.list(), ('bilbo', 'frodo'))
 
+    def test_local_cache_delete_many(self):
+        results = self.cache.delete_many(['bilbo', 'frodo', 'samwise'])
+        self.assertEqual(results, {'bilbo': 'deleted', 'frodo': 'deleted',
+                                   'samwise': 'missing'})
+        self.assertEqual(os.listdir(self.orderpath), [])
+
+    def test_local_cache_capacity(self):
+        results = self.cache.capacity()
+        self.assertTrue(results['percent_used'].endswith('%'))
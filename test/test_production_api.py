@@ -11,11 +11,12 @@ from api.domain.user import User
 from api.external.mocks import inventory, onlinecache
 from api.interfaces.production.version1 import API
 from api.notification import emails
+from api.system import errors
 from api.providers.configuration.configuration_provider import ConfigurationProvider
 from api.providers.production.mocks.production_provider import MockProductionProvider
 from api.providers.production.production_provider import ProductionProvider
 from api.providers.ordering.ordering_provider import OrderingProvider
-from mock import patch
+from mock import patch, MagicMock
 from copy import deepcopy
 from functools import partial
 
@@ -310,6 +311,62 @@ class TestProductionAPI(unittest.TestCase):
                                            status='processing')
         self.assertFalse(res)
 
+    @patch('api.external.inventory.get_cached_session', inventory.get_cached_session)
+    @patch('api.external.inventory.update_order_status', inventory.update_order_status_fail)
+    @patch('os.path.getsize', lambda y: 999)
+    def test_update_products_batch(self):
+        order = Order.find(self.mock_order.generate_testing_order(self.user_id))
+        order.update('order_source', 'ee')
+        scenes = order.scenes({'name !=': 'plot'})
+        updates = [{'action': 'update_status', 'name': scenes[0].name,
+                    'orderid': order.orderid, 'processing_loc': 'L8SRLEXAMPLE',
+                    'status': 'processing'},
+                   {'action': 'mark_product_complete', 'name': scenes[1].name,
+                    'orderid': order.orderid, 'processing_loc': 'L8SRLEXAMPLE',
+                    'completed_file_location': '/some/loc',
+                    'cksum_file_location': 'some checksum',
+                    'log_file_contents': 'some log'},
+                   {'action': 'set_product_error', 'name': scenes[2].name,
+                    'orderid': order.orderid, 'processing_loc': 'L8SRLEXAMPLE',
+                    'error': 'solar zenith angle out of range'},
+                   {'action': 'update_status', 'name': 'not-a-scene',
+                    'orderid': order.orderid, 'status': 'processing'},
+                   {'action': 'not_an_action', 'name': scenes[0].name,
+                    'orderid': order.orderid}]
+
+        results = api.update_products(updates)
+        self.assertEqual(results[:3], [True, True, True])
+        self.assertIn('msg', results[3])
+        self.assertIn('msg', results[4])
+
+        self.assertEqual(Scene.find(scenes[0].id).status, 'processing')
+        complete = Scene.find(scenes[1].id)
+        self.assertEqual(complete.status, 'complete')
+        self.assertEqual(complete.download_size, 999)
+        self.assertEqual(complete.failed_lta_status_update, 'C')
+        unavailable = Scene.find(scenes[2].id)
+        self.assertEqual(unavailable.status, 'unavailable')
+        self.assertEqual(unavailable.failed_lta_status_update, 'R')
+
+    @patch('api.external.inventory.get_cached_session', inventory.get_cached_session)
+    def test_update_ee_statuses_by_unit_range(self):
+        scenes = [MagicMock(id=i, ee_unit_id=u, failed_lta_status_update=None)
+                  for i, u in enumerate([1, 2, 3, 5, 6, 9])]
+
+        calls = []
+
+        def update_order_status(token, ee_order_id, first, status, last):
+            calls.append((first, last))
+            if first == 5:
+                raise Exception('lta comms failed')
+
+        with patch('api.external.inventory.update_order_status', update_order_status):
+            failed = production_provider.update_ee_statuses([(s, '0101', 'C') for s in scenes])
+
+        self.assertEqual(sorted(calls), [(1, 3), (5, 6), (9, 9)])
+        self.assertEqual([s.ee_unit_id for s in failed], [5, 6])
+        self.assertTrue(all(s.failed_lta_status_update == 'C' for s in failed))
+
     def test_production_set_product_error_unavailable_night(self):
         """
         Move a scene status from error to unavailable based on the solar zenith (TOA)
@@ -380,6 +437,8 @@ class TestProductionAPI(unittest.TestCase):
     @patch('api.external.onlinecache.capacity', onlinecache.mock_capacity)
     @patch('api.external.onlinecache.exists', onlinecache.mock_exists)
     @patch('api.external.onlinecache.delete', onlinecache.mock_delete)
+    @patch('api.external.onlinecache.delete_many', onlinecache.mock_delete_many)
+    @patch('api.external.onlinecache.list_orders', onlinecache.mock_list_orders)
     def test_production_purge_orders(self):
         new_completion_date = datetime.datetime.now() - datetime.timedelta(days=12)
         order = Order.find(self.mock_order.generate_testing_order(self.user_id))
@@ -387,6 +446,26 @@ class TestProductionAPI(unittest.TestCase):
         order.update('completion_date', new_completion_date)
         self.assertTrue(production_provider.purge_orders())
 
+    @patch('api.external.onlinecache.capacity', onlinecache.mock_capacity)
+    def test_production_purge_orders_retries_failed_deletes(self):
+        new_completion_date = datetime.datetime.now() - datetime.timedelta(days=12)
+        order = Order.find(self.mock_order.generate_testing_order(self.user_id))
+        order.update('status', 'complete')
+        order.update('completion_date', new_completion_date)
+
+        # a remote error must not stop the purge from finishing
+        with patch('api.external.onlinecache.delete_many', side_effect=TypeError('ssh')), \
+                patch('api.external.onlinecache.list_orders', return_value=()):
+            self.assertTrue(production_provider.purge_orders())
+        self.assertEqual(Order.find(order.id).status, 'purged')
+
+        # the order is still on disk, so the next purge deletes it
+        with patch('api.external.onlinecache.delete_many',
+                   side_effect=onlinecache.mock_delete_many) as delete_many, \
+                patch('api.external.onlinecache.list_orders', return_value=(order.orderid,)):
+            self.assertEqual(production_provider.delete_purged_orders([]), [])
+        delete_many.assert_called_once_with({order.orderid})
+
     # need to figure a test for emails.send_email
     @patch('api.notification.emails.Emails.send_email', mock_production_provider.respond_true)
     def test_production_send_initial_emails(self):
@@ -621,6 +700,25 @@ class TestProductionAPI(unittest.TestCase):
         order.update('status', 'ordered')
         self.assertTrue(production_provider.finalize_orders([order]))
 
+    @patch('api.providers.production.production_provider.ProductionProvider.send_completion_email',
+           mock_production_provider.respond_true)
+    def test_production_finalize_orders_completes_finished(self):
+        finished = Order.find(self.mock_order.generate_testing_order(self.user_id))
+        Scene.bulk_update([s.id for s in finished.scenes()], {'status': 'complete'})
+        finished.update('order_source', 'ee')
+        emailed = Order.find(self.mock_order.generate_testing_order(self.user_id))
+        Scene.bulk_update([s.id for s in emailed.scenes()], {'status': 'unavailable'})
+        emailed.update('completion_email_sent', None)
+        open_order = Order.find(self.mock_order.generate_testing_order(self.user_id))
+        Scene.bulk_update([s.id for s in open_order.scenes()], {'status': 'processing'})
+
+        self.assertTrue(production_provider.finalize_orders([finished, emailed.id, open_order]))
+
+        self.assertEqual(Order.find(finished.id).status, 'complete')
+        self.assertEqual(Order.find(emailed.id).status, 'complete')
+        self.assertIsNotNone(Order.find(emailed.id).completion_email_sent)
+        self.assertEqual(Order.find(open_order.id).status, 'ordered')
+
     @patch('api.providers.production.production_provider.ProductionProvider.send_completion_email',
            mock_production_provider.respond_true)
     def test_production_update_order_if_complete(self):
@@ -847,6 +945,47 @@ class TestProductionAPI(unittest.TestCase):
         new_time = scene.status_modified
         self.assertGreater(new_time, old_time)
 
+    def test_resolve_error_precedence(self):
+        name = 'LE07_L1TP_026027_20170912_20171008_01_T1'
+        # matches both http_errors and network_errors, http is checked first
+        log = 'error: socket.timeout\nrequests: CONNECTION TIMED OUT'
+        resolution = errors.resolve(log, name)
+        self.assertEqual(resolution.reason, 'HTTP connection error')
+        self.assertEqual(set(resolution.extra), {'retry_after', 'retry_limit'})
+
+        resolution = errors.resolve('solar zenith angle is too large', name)
+        self.assertEqual(resolution.status, 'unavailable')
+        self.assertIsNone(resolution.extra)
+
+        self.assertIsNone(errors.resolve('unknown failure', name))
+
+    def test_scene_with_order(self):
+        order = Order.find(self.mock_order.generate_testing_order(self.user_id))
+        scene = order.scenes()[0]
+
+        found, order_cols = Scene.with_order(scene.name, order.orderid)
+        self.assertEqual(found.id, scene.id)
+        self.assertEqual(order_cols['orderid'], order.orderid)
+        self.assertEqual(order_cols['status'], order.status)
+        self.assertEqual(order_cols['order_source'], order.order_source)
+
+        self.assertEqual(Scene.with_order('not-a-scene', order.orderid), (None, None))
+
+    def test_save_only_writes_dirty_fields(self):
+        order_id = self.mock_order.generate_testing_order(self.user_id)
+        scene = Scene.where({'order_id': order_id}).pop()
+        stale = Scene.where({'id': scene.id}).pop()
+        scene.update('note', 'updated elsewhere')
+
+        self.assertEqual(stale.dirty_fields(), ())
+        stale.status = 'oncache'
+        self.assertEqual(stale.dirty_fields(), ('status',))
+        stale.save()
+
+        self.assertEqual(stale.note, 'updated elsewhere')
+        self.assertEqual(stale.dirty_fields(), ())
+        self.assertIsNotNone(stale.status_modified)
+
 
 if __name__ == '__main__':
     unittest.main(verbosity=2)